@@ -20,35 +20,96 @@ from . import ast_helpers
 
 
 class ScopeAnalyser(ast.NodeVisitor):
-    """Analyser of scopes."""
+    """Analyser of scopes.
+
+    Every node of the tree is visited exactly once (apart from
+    expression contexts of names), through `visit`, so subclasses can
+    hook into it to do other work in the same pass.
+
+    :ivar resolved: Maps every loaded name that could be resolved to
+        its binding.  It is also stored on the module as `resolved`.
+    """
 
     def __init__(self):
         self.scopes = ScopeStack()
+        self.resolved = {}
+        self._unresolved = []
+        self._augmented = None
 
     def analyse(self, node):
         self.visit(node)
 
+    def _push(self, scope_class):
+        self._unresolved.append([])
+        return self.scopes.push(scope_class)
+
+    def _pop(self):
+        """Leave the current scope.
+
+        Loads in it that could not be resolved when they were seen
+        are tried again, since the name may have been bound later on,
+        e.g. a function using a module-level name defined below it.
+        Loads that are still unresolved are passed on to the
+        enclosing scope.
+        """
+        unresolved = self._unresolved.pop()
+        for name, scopes, node in unresolved:
+            binding = self._resolve(name, scopes)
+            if binding:
+                binding.use(scopes[-1], node)
+                self.resolved[node] = binding
+            elif self._unresolved:
+                self._unresolved[-1].append((name, scopes, node))
+            # ignore errors
+        return self.scopes.pop()
+
     def _bind(self, name, binding):
-        self.scopes.top().put(name, binding)
+        scope = self.scopes.top()
+        if name in scope.globals:
+            scope = self.scopes.module()
+        elif name in scope.nonlocals:
+            scope = self._enclosing_function(name) or scope
+        scope.put(name, binding)
+
+    def _enclosing_function(self, name):
+        """Return the innermost enclosing function scope that binds
+        `name`, or `None`.
+        """
+        for scope in reversed(self.scopes.scopes[:-1]):
+            if isinstance(scope, FunctionScope) and name in scope:
+                return scope
+        return None
+
+    def _resolve(self, name, scopes):
+        """Find the binding of `name` as seen from the innermost of
+        `scopes`.
+        """
+        top = scopes[-1]
+        if name in top.globals:
+            return scopes[0].get(name)
+        binding = top.get(name)
+        if binding:
+            return binding
+
+        enclosing = [scope for scope in scopes[:-1]
+                     if isinstance(scope, (FunctionScope, ModuleScope))]
+        for scope in reversed(enclosing):
+            binding = scope.get(name)
+            if binding:
+                return binding
+        return None
 
     def _handle_load(self, node):
         name = _node_name(node)
         if not name:
             return
-        binding = self.scopes.top().get(name)
+        scopes = list(self.scopes)
+        binding = self._resolve(name, scopes)
         if binding:
-            binding.use(self.scopes.top(), node)
+            binding.use(scopes[-1], node)
+            self.resolved[node] = binding
             return
-
-        scopes = [scope for scope in list(self.scopes)[:-1]
-                  if isinstance(scope, (FunctionScope, ModuleScope))]
-        for scope in reversed(scopes):
-            binding = scope.get(name)
-            if binding:
-                binding.use(self.scopes.top(), node)
-                return
-
-        # ignore errors
+        self._unresolved[-1].append((name, scopes, node))
 
     def _handle_store(self, node):
         name = _node_name(node)
@@ -61,66 +122,164 @@ class ScopeAnalyser(ast.NodeVisitor):
         name = _node_name(node)
         if not name:
             return
-        if name in self.scopes.top():
-            self.scopes.top().remove(name)
+        scope = self.scopes.top()
+        if name in scope:
+            scope[name].use(scope, node)
+            del scope[name]
 
     def visit_Name(self, node):
-        if isinstance(node.ctx, (ast.Load, ast.AugLoad)):
+        if node is self._augmented:
+            # `x += 1` reads and rebinds the same binding.
+            self._handle_load(node)
+        elif isinstance(node.ctx, (ast.Load, ast.AugLoad)):
             self._handle_load(node)
         elif isinstance(node.ctx, (ast.Store, ast.AugStore)):
             self._handle_store(node)
         elif isinstance(node.ctx, ast.Del):
             self._handle_del(node)
 
+    def visit_Assign(self, node):
+        # the value is evaluated before the targets are bound.
+        self.visit(node.value)
+        for target in node.targets:
+            self.visit(target)
+
+    def visit_AugAssign(self, node):
+        self.visit(node.value)
+        self.visit(node.op)
+        self._augmented = node.target
+        self.visit(node.target)
+        self._augmented = None
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self.visit(node.target)
+        for stmt in node.body + node.orelse:
+            self.visit(stmt)
+
+    visit_AsyncFor = visit_For
+
+    def visit_comprehension(self, node):
+        self.visit(node.iter)
+        self.visit(node.target)
+        for expr in node.ifs:
+            self.visit(expr)
+
+    def visit_Global(self, node):
+        self.scopes.top().globals.update(node.names)
+
+    def visit_Nonlocal(self, node):
+        scope = self.scopes.top()
+        scope.nonlocals.update(node.names)
+        # the inner function shares the variable, which counts as a
+        # use of it.
+        for name in node.names:
+            outer = self._enclosing_function(name)
+            if outer is not None:
+                outer[name].use(scope, node)
+
     def visit_GeneratorExp(self, node):
-        self.scopes.push(GeneratorScope)
+        self._push(GeneratorScope)
         for gen in node.generators:
             self.visit(gen)
         self.visit(node.elt)
-        self.scopes.pop()
+        self._pop()
+
+    def visit_ExceptHandler(self, node):
+        if node.type:
+            self.visit(node.type)
+        if isinstance(node.name, str):
+            # Python 3 gives the name as a string rather than a `Name`.
+            self._bind(node.name, Assignment(node))
+        elif node.name:
+            self.visit(node.name)
+        for stmt in node.body:
+            self.visit(stmt)
 
     def visit_FunctionDef(self, node):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
         self._bind(node.name, FunctionDefinition(node))
         self.visit_Lambda(node)
-        
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
     def visit_Lambda(self, node):
+        # default values are evaluated in the enclosing scope, and so
+        # are the annotations of Python 3.
+        self.visit(node.args)
+        if getattr(node, 'returns', None):
+            self.visit(node.returns)
+        for param in getattr(node, 'type_params', ()):
+            self.visit(param)
         args = ast_helpers.collect_args(node)
         for wildcard in (node.args.vararg, node.args.kwarg):
             if not wildcard:
                 continue
-            args.append(wildcard)
-        node.scope = self.scopes.push(FunctionScope)
+            # an `ast.arg` from Python 3.4 on.
+            args.append(getattr(wildcard, 'arg', wildcard))
+        node.scope = self._push(FunctionScope)
         for name in args:
             self._bind(name, Argument(node))
-        self.generic_visit(node)
-        self.scopes.pop()
+        if isinstance(node.body, list):
+            for stmt in node.body:
+                self.visit(stmt)
+        else:
+            self.visit(node.body)
+        self._pop()
 
     def visit_ClassDef(self, node):
-        node.scope = self.scopes.push(ClassScope)
-        self.generic_visit(node)
-        self.scopes.pop()
+        # Python 3 adds keywords, such as `metaclass=...`.
+        for expr in (node.bases + getattr(node, 'keywords', []) +
+                     node.decorator_list):
+            self.visit(expr)
+        node.scope = self._push(ClassScope)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._pop()
         self._bind(node.name, ClassDefinition(node))
 
     def visit_Module(self, node):
-        node.scope = self.scopes.push(ModuleScope)
+        node.scope = self._push(ModuleScope)
+        node.resolved = self.resolved
         self.generic_visit(node)
-        self.scopes.pop()
+        self._pop()
 
     def visit_ImportFrom(self, node):
         for alias in node.names:
+            # the names that `from x import *` binds are not known.
+            if alias.name == '*':
+                continue
             self._bind(alias.asname or alias.name, Importation(
                     node, node.module))
+        self.generic_visit(node)
 
     def visit_Import(self, node):
         for alias in node.names:
-            self._bind(alias.asname or alias.name, Importation(
+            # `import os.path` binds `os`.
+            self._bind(alias.asname or alias.name.split('.')[0], Importation(
                     node, alias.name))
+        self.generic_visit(node)
 
 
 class Scope(dict):
+    """Maps names to their current binding.
+
+    :ivar bindings: Every `(name, binding)` made in the scope, in
+        order, including the ones that have since been rebound.
+    :ivar globals: Names declared `global` in the scope.
+    :ivar nonlocals: Names declared `nonlocal` in the scope.
+    """
+
+    def __init__(self):
+        dict.__init__(self)
+        self.bindings = []
+        self.globals = set()
+        self.nonlocals = set()
 
     def put(self, name, binding):
         self[name] = binding
+        self.bindings.append((name, binding))
 
 
 class FunctionScope(Scope):
@@ -195,6 +354,9 @@ class ScopeStack(object):
     def top(self):
         return self.scopes[-1]
 
+    def module(self):
+        return self.scopes[0]
+
 
 def _node_name(node):
     if hasattr(node, 'id'):
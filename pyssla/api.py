@@ -0,0 +1,112 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Library interface for running pyssla in-process.
+
+Example:
+
+    from pyssla import api
+
+    rules = api.load_rules({'cyclomatic-complexity': {'threshold': 8}})
+    for message in api.check_source(text, 'foo.py', rules):
+        print(message.lineno, message.rule, message.message)
+
+The check functions return lists of `pyssla.checker.Message`.  When no rule
+set is given, the default configuration is loaded once and shared by
+all calls.
+"""
+
+import ast
+
+from .checker import Checker
+from .ruleset import RuleSet
+
+_default_rules = None
+
+
+def load_rules(config=None, disable=()):
+    """Load and configure the installed rules, see `RuleSet.load`."""
+    return RuleSet.load(config, disable)
+
+
+def default_rules():
+    """Return the shared rule set with the default configuration."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = load_rules()
+    return _default_rules
+
+
+def prepare(tree):
+    """Annotate `tree` in place with parent links and scopes, in the
+    same traversal as checking it would, so that checking it later
+    does not analyse it again.
+    """
+    Checker(None).analyse(tree, complete=True)
+    return tree
+
+
+def _rules_or_default(rules):
+    return rules if rules is not None else default_rules()
+
+
+def check_tree(tree, filename, rules=None):
+    """Check an already parsed module `tree`.
+
+    The tree is annotated in place with the parent links and scopes
+    that the rules require, unless it already has them.  Once it has
+    scopes it also has parent links, and is not annotated again.
+    """
+    checker = _rules_or_default(rules).checker(filename)
+    checker.analyse(tree)
+    return checker.messages
+
+
+def analyse_source(source, filename, rules=None, cache=None, tree=None):
+    """Parse and check the module source text `source`, returning
+    the `pyssla.checker.Checker` that was used.
+
+    `tree` is the already parsed module, if available.  If a
+    `pyssla.rulecache.RuleCache` is given, only the rules whose results
+    for `source` are not in it are run, and their results are stored.
+    """
+    if tree is None:
+        tree = ast.parse(source, filename)
+    rules = _rules_or_default(rules)
+    if cache is not None:
+        return cache.analyse(tree, source, filename, rules)
+    checker = rules.checker(filename)
+    checker.analyse(tree, source)
+    return checker
+
+
+def check_source(source, filename, rules=None, cache=None):
+    """Parse and check the module source text `source`."""
+    return analyse_source(source, filename, rules, cache).messages
+
+
+def check_many(sources, rules=None):
+    """Check `(filename, source)` pairs, yielding `(filename,
+    messages)` as each source has been checked.
+
+    A source may also be given as a parsed tree.
+    """
+    rules = _rules_or_default(rules)
+    for filename, source in sources:
+        if isinstance(source, ast.AST):
+            messages = check_tree(source, filename, rules)
+        else:
+            messages = check_source(source, filename, rules)
+        yield filename, messages
@@ -15,6 +15,19 @@
 import ast
 
 
+def _types(*names):
+    return tuple(getattr(ast, name) for name in names if hasattr(ast, name))
+
+
+# the node types of functions and loops, including the asynchronous
+# ones of Python 3.
+FUNCTION_TYPES = _types('FunctionDef', 'AsyncFunctionDef')
+ASYNC_FUNCTION_TYPES = _types('AsyncFunctionDef')
+FOR_TYPES = _types('For', 'AsyncFor')
+LOOP_TYPES = FOR_TYPES + (ast.While,)
+WITH_TYPES = _types('With', 'AsyncWith')
+
+
 def set_parent(node, parent=None):
     node.parent = parent
     for child in ast.iter_child_nodes(node):
@@ -77,10 +90,139 @@ def collect_args(node):
         for arg in arglist:
             if isinstance(arg, ast.Tuple):
                 add_args(arg.elts)
-            else:
+            elif isinstance(arg, ast.Name):
                 args.append(arg.id)
+            else:
+                # an `ast.arg` in Python 3.
+                args.append(arg.arg)
 
-    assert isinstance(node, ast.FunctionDef)
+    assert isinstance(node, FUNCTION_TYPES + (ast.Lambda,))
+    add_args(getattr(node.args, 'posonlyargs', []))
     add_args(node.args.args)
+    add_args(getattr(node.args, 'kwonlyargs', []))
 
     return args
+
+
+def self_attributes(node, method=None):
+    """Return the `self.<attr>` nodes that the methods of class `node`,
+    or only the method named `method`, assign to with plain
+    assignments.
+    """
+    predicate = "[name=={0!r}]".format(method) if method else ""
+    return ast_path(
+        node, "./FunctionDef" + predicate +
+        "//Assign/Attribute[value.id=='self' and isinstance(ctx, ast.Store)]")
+
+
+def _is_main_block(node):
+    """Return True for `if __name__ == '__main__':`."""
+    test = node.test
+    return (isinstance(test, ast.Compare) and
+            isinstance(test.left, ast.Name) and
+            test.left.id == '__name__' and
+            len(test.comparators) == 1 and
+            isinstance(test.comparators[0], ast.Str) and
+            test.comparators[0].s == '__main__')
+
+
+def classify_statement(child):
+    """Classify the module-level statement `child`.
+
+    Returns one of 'import', 'constant', 'internal constant',
+    'exception class', 'class', 'interface function', 'internal
+    function or class', 'string', 'call', 'main block', 'compound
+    statement' or 'other'.
+    """
+    if isinstance(child, (ast.Import, ast.ImportFrom)):
+        return 'import'
+    elif isinstance(child, ast.Assign):
+        if (isinstance(child.targets[0], ast.Name) and
+                child.targets[0].id.startswith('_')):
+            return 'internal constant'
+        return 'constant'
+    elif isinstance(child, ast.ClassDef):
+        if child.name.startswith("_"):
+            return 'internal function or class'
+        elif child.name.endswith("Error"):
+            return 'exception class'
+        else:
+            return 'class'
+    elif isinstance(child, FUNCTION_TYPES):
+        if child.name.startswith("_"):
+            return 'internal function or class'
+        else:
+            return 'interface function'
+    elif isinstance(child, ast.Expr):
+        if isinstance(child.value, ast.Str):
+            return 'string'
+        elif isinstance(child.value, ast.Call):
+            return 'call'
+    elif isinstance(child, ast.If):
+        if _is_main_block(child):
+            return 'main block'
+        return 'compound statement'
+    elif isinstance(child, LOOP_TYPES + WITH_TYPES) or \
+            child.__class__.__name__ in ('TryExcept', 'TryFinally', 'Try'):
+        return 'compound statement'
+    return 'other'
+
+
+def dotted_name(node):
+    """Return the dotted name `a.b.c` for an attribute chain, or
+    `None` if `node` is something else.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        prefix = dotted_name(node.value)
+        if prefix is not None:
+            return prefix + '.' + node.attr
+    return None
+
+
+def imported_name(statement, name):
+    """Return the full name of what import `statement` binds to
+    `name`, or `None` for relative imports.
+    """
+    for alias in statement.names:
+        if isinstance(statement, ast.Import):
+            if alias.asname == name:
+                return alias.name
+            if alias.asname is None and alias.name.split('.')[0] == name:
+                return name
+        elif (alias.asname or alias.name) == name:
+            if statement.level or not statement.module:
+                # relative imports are not followed.
+                return None
+            return statement.module + '.' + alias.name
+    return None
+
+
+def qualified_name(node, checker):
+    """Return the full dotted name of the builtin or imported name
+    that `node` refers to, following imports, e.g. `time.sleep` for
+    `sleep` after `from time import sleep` or for `t.sleep` after
+    `import time as t`.  Returns `None` if `node` refers to something
+    else, such as a variable.
+
+    Names are resolved with `Checker.binding_for`, so rules using
+    this must require `SCOPES`.
+    """
+    attributes = []
+    while isinstance(node, ast.Attribute):
+        attributes.insert(0, node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    binding = checker.binding_for(node)
+    if binding is None:
+        # a builtin.
+        root = node.id
+    elif isinstance(binding.source, (ast.Import, ast.ImportFrom)):
+        root = imported_name(binding.source, node.id)
+        if root is None:
+            return None
+    else:
+        return None
+    return '.'.join([root] + attributes)
@@ -13,29 +13,373 @@
 # limitations under the License.
 
 import ast
+import tokenize
 from collections import defaultdict
 
+from .analyser import ScopeAnalyser, ScopeStack
+from .rule import Rule, PARENTS, SCOPES, SOURCE, TOKENS
 
-class Checker(ast.NodeVisitor):
 
-    def __init__(self, filename):
+class Message(object):
+    """A single violation reported by a rule.
+
+    The message text is only formatted from `template` and `args` when
+    it is first needed.
+
+    :ivar value: The metric that the rule measured, such as the
+        complexity of a function, or `None`.
+    :ivar cumtime: The cumulative time, in seconds, spent in the
+        function the violation is in according to profile data, or
+        `None`; see `pyssla.hotness`.
+    """
+
+    def __init__(self, filename, lineno, rule, template, args=(),
+                 value=None):
+        self.filename = filename
+        self.lineno = lineno
+        self.rule = rule
+        self.template = template
+        self.args = args
+        self.value = value
+        self.cumtime = None
+        self._message = None
+
+    @property
+    def message(self):
+        if self._message is None:
+            if self.args:
+                self._message = self.template.format(*self.args)
+            else:
+                self._message = self.template
+        return self._message
+
+    def __str__(self):
+        if self.cumtime is not None:
+            return '{0}: {1}: {2} [{3:.3f}s cumulative]'.format(
+                self.filename, self.lineno, self.message, self.cumtime)
+        return '{0}: {1}: {2}'.format(
+            self.filename, self.lineno, self.message)
+
+    def sort_key(self):
+        return (self.filename, self.lineno, self.rule or '', self.message)
+
+    def to_dict(self):
+        data = {
+            'filename': self.filename,
+            'lineno': self.lineno,
+            'rule': self.rule,
+            'message': self.message,
+            'args': list(self.args)
+            }
+        if self.value is not None:
+            data['value'] = self.value
+        if self.cumtime is not None:
+            data['cumtime'] = self.cumtime
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        message = cls(data['filename'], data['lineno'], data['rule'],
+                      data['message'])
+        message.args = tuple(data.get('args', ()))
+        message.value = data.get('value')
+        message.cumtime = data.get('cumtime')
+        message._message = data['message']
+        return message
+
+
+# rules for these node types are also run for their asynchronous
+# variants in Python 3.
+_ASYNC_VARIANTS = dict(
+    (getattr(ast, name), getattr(ast, 'Async' + name))
+    for name in ('FunctionDef', 'For', 'With')
+    if hasattr(ast, 'Async' + name))
+
+
+def _binding_key(node):
+    """Return a key identifying the binding that name `node` refers
+    to, or `None` if `node` is not a name.
+    """
+    if not isinstance(node, ast.Name):
+        return None
+    owner = node.parent
+    while owner is not None and not hasattr(owner, 'scope'):
+        owner = owner.parent
+    return (owner, node.id)
+
+
+def _tokenize(source):
+    lines = iter(source.splitlines(True))
+    return list(tokenize.generate_tokens(lambda: next(lines, '')))
+
+
+def _overrides(rule, name):
+    """Return True if `rule` implements the `Rule` hook `name`."""
+    for klass in type(rule).__mro__:
+        if klass is Rule:
+            return False
+        if name in klass.__dict__:
+            return True
+    return False
+
+
+class _Traversal(ScopeAnalyser):
+    """Analyses scopes, optionally links parents, and runs the enter
+    and leave hooks of the rules in a single pass over the tree.
+    """
+
+    def __init__(self, checker, parents):
+        ScopeAnalyser.__init__(self)
+        self.checker = checker
+        self._parents = parents
+        self._parent = None
+
+    def visit(self, node):
+        parent = self._parent
+        if self._parents:
+            node.parent = parent
+        self._parent = node
+        self.checker.enter(node)
+        ScopeAnalyser.visit(self, node)
+        self.checker.leave(node)
+        self._parent = parent
+
+
+class _SimpleTraversal(object):
+    """Runs the enter and leave hooks of the rules, and optionally
+    links parents, without analysing scopes.
+    """
+
+    scopes = None
+
+    def __init__(self, checker, parents):
+        self.checker = checker
+        self._parents = parents
+
+    def visit(self, node, parent=None):
+        if self._parents:
+            node.parent = parent
+        self.checker.enter(node)
+        for child in ast.iter_child_nodes(node):
+            self.visit(child, node)
+        self.checker.leave(node)
+
+
+class _PreparedTraversal(object):
+    """Runs the enter and leave hooks of the rules over a tree that
+    already has parents and scopes.
+    """
+
+    def __init__(self, checker):
+        self.checker = checker
+        self.scopes = ScopeStack()
+
+    def visit(self, node):
+        self.checker.enter(node)
+        scope = getattr(node, 'scope', None)
+        if scope is None:
+            for child in ast.iter_child_nodes(node):
+                self.visit(child)
+        elif isinstance(node, ast.Module):
+            self._visit_in(scope, node.body)
+        else:
+            # as in the analysis, only the body of a function or class
+            # is in its own scope.
+            for field, value in ast.iter_fields(node):
+                if field == 'body':
+                    self._visit_in(scope, value)
+                else:
+                    self._visit_children(value)
+        self.checker.leave(node)
+
+    def _visit_children(self, value):
+        if isinstance(value, ast.AST):
+            self.visit(value)
+        elif isinstance(value, list):
+            for child in value:
+                if isinstance(child, ast.AST):
+                    self.visit(child)
+
+    def _visit_in(self, scope, value):
+        self.scopes.scopes.append(scope)
+        self._visit_children(value)
+        self.scopes.pop()
+
+
+class Checker(object):
+    """Dispatches nodes to rules and collects what they report.
+
+    Rules are run in a single traversal of the tree that also links
+    parents and analyses scopes, unless the tree already has them or
+    none of the rules require them (see `Rule.requires`).  The `enter`
+    and `leave` hooks of rules are called during the
+    traversal, with `scope` being the scope the node is in.  `analyse`
+    is called once the whole tree has been traversed, in the order
+    the nodes were entered.
+
+    If `dedup` is true, only the first report by a rule for each
+    binding is kept, e.g. one short variable name message per name
+    and scope rather than one per assignment.
+    """
+
+    def __init__(self, filename, dedup=False):
         self.filename = filename
         self.messages = []
+        self.records = defaultdict(list)
+        self.rule = None
+        self.scopes = None
+        self.source = None
+        self.tokens = None
+        self.tree = None
+        self.resolved = {}
+        self.requires = set([PARENTS]) if dedup else set()
         self._rules = defaultdict(list)
+        self._enter = defaultdict(list)
+        self._leave = defaultdict(list)
+        self._pending = []
+        self._dedup = set() if dedup else None
+
+    @property
+    def scope(self):
+        """The current scope during the traversal."""
+        return self.scopes.top()
 
     def add_rule(self, rule):
-        for type in rule.types:
-            self._rules[type].append(rule)
+        self.requires.update(rule.requires)
+        for name, table in (('analyse', self._rules),
+                            ('enter', self._enter),
+                            ('leave', self._leave)):
+            if _overrides(rule, name):
+                for type in rule.types:
+                    table[type].append(rule)
+                    variant = _ASYNC_VARIANTS.get(type)
+                    if variant is not None and variant not in rule.types:
+                        table[variant].append(rule)
 
-    def analyse(self, tree):
-        self.visit(tree)
+    def analyse(self, tree, source=None, complete=False):
+        """Check module `tree`.
 
-    def visit(self, node):
-        type = node.__class__
-        for rule in self._rules.get(type, []):
+        `source` is the source text of the module, if available.  If
+        `complete` is true, parents and scopes are always added to the
+        tree, see `pyssla.api.prepare`.
+        """
+        requires = self.requires
+        if complete:
+            requires = requires | set([PARENTS, SCOPES])
+        if source is not None:
+            if SOURCE in requires or TOKENS in requires:
+                self.source = source
+            if TOKENS in requires:
+                self.tokens = _tokenize(source)
+
+        self.tree = tree
+        if hasattr(tree, 'scope'):
+            traversal = _PreparedTraversal(self)
+        elif SCOPES in requires:
+            # parents are always linked along with scopes, so that a
+            # tree with scopes is complete when it is checked again.
+            traversal = _Traversal(self, True)
+        else:
+            traversal = _SimpleTraversal(self, PARENTS in requires)
+        self.scopes = traversal.scopes
+        self.resolved = getattr(
+            tree, 'resolved', getattr(traversal, 'resolved', {}))
+        traversal.visit(tree)
+        self.scopes = None
+        for rule, node in self._pending:
+            self.rule = rule
             rule.analyse(node, self)
-        self.generic_visit(node)
+        self.rule = None
+        self._pending = []
+
+    def enter(self, node):
+        type = node.__class__
+        for rule in self._rules.get(type, ()):
+            self._pending.append((rule, node))
+        for rule in self._enter.get(type, ()):
+            self.rule = rule
+            rule.enter(node, self)
+        self.rule = None
+
+    def leave(self, node):
+        for rule in self._leave.get(node.__class__, ()):
+            self.rule = rule
+            rule.leave(node, self)
+        self.rule = None
+
+    def binding_for(self, node):
+        """Return the binding that the loaded name `node` refers to,
+        or `None` if it is not bound in the module, e.g. a builtin.
+
+        Names are resolved during the traversal, so this is only
+        complete for all names once it is done, in `Rule.analyse`.
+        Rules using it must require `SCOPES`.
+        """
+        return self.resolved.get(node)
+
+    def _is_duplicate(self, name, node):
+        if self._dedup is None:
+            return False
+        key = _binding_key(node)
+        if key is None:
+            return False
+        key = (name,) + key
+        if key in self._dedup:
+            return True
+        self._dedup.add(key)
+        return False
+
+    def report(self, node, message, *args, **kwargs):
+        """Report a violation at `node`.
+
+        `message` is a format string for `args`; it is not formatted
+        until the message text is needed.  The metric the rule
+        measured, if any, is given as the keyword argument `value`.
+        """
+        name = self.rule.name if self.rule is not None else None
+        if self._is_duplicate(name, node):
+            return
+        self.messages.append(
+            Message(self.filename, node.lineno, name, message, args,
+                    kwargs.get('value')))
+
+    def record(self, value):
+        """Record `value` for the project-wide analysis of the current
+        rule, see `pyssla.rule.Rule.finish`.
+
+        Values should be lists or tuples of strings and numbers so
+        that they can be stored in result files.
+        """
+        self.records[self.rule.name].append(value)
+
+
+class StatisticsChecker(Checker):
+    """A checker that only counts violations per rule."""
+
+    def __init__(self, filename, dedup=False):
+        Checker.__init__(self, filename, dedup)
+        self.counts = defaultdict(int)
+
+    def report(self, node, message, *args, **kwargs):
+        name = self.rule.name if self.rule is not None else None
+        if self._is_duplicate(name, node):
+            return
+        self.counts[name] += 1
+
+
+class ProjectChecker(object):
+    """Collects the violations that rules report once all files have
+    been checked.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.rule = None
 
-    def report(self, node, message):
-        self.messages.append('{0}: {1}: {2}'.format(
-            self.filename, node.lineno, message))
+    def report(self, filename, lineno, message, *args, **kwargs):
+        """Report a violation at `lineno` in `filename`, see
+        `Checker.report`.
+        """
+        name = self.rule.name if self.rule is not None else None
+        self.messages.append(Message(filename, lineno, name, message, args,
+                                     kwargs.get('value')))
@@ -0,0 +1,169 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Reading modules straight from the object store of a git repository."""
+
+import os
+import subprocess
+
+from .sources import MemorySource
+
+
+class GitError(Exception):
+    pass
+
+
+def _text(data):
+    if isinstance(data, str):
+        return data
+    return data.decode('utf-8', 'replace')
+
+
+class CatFile(object):
+    """A long-lived `git cat-file --batch` process for reading objects
+    from the repository at `repo`.
+    """
+
+    def __init__(self, repo='.'):
+        self.repo = repo
+        self._process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'], cwd=repo,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.wait()
+
+    def read(self, name):
+        """Return `(sha, type, data)` of the object `name`, which can
+        be anything git accepts as a revision.
+        """
+        self._process.stdin.write(name.encode('utf-8') + b'\n')
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise GitError("{0}: no such object".format(name))
+        sha, kind, size = header
+        data = self._process.stdout.read(int(size))
+        self._process.stdout.read(1)
+        return _text(sha), _text(kind), data
+
+    def tree(self, name):
+        """Yield `(mode, path, sha)` for the entries of tree `name`."""
+        sha, kind, data = self.read(name)
+        if kind == 'commit':
+            # the first line of a commit is "tree <sha>".
+            sha, kind, data = self.read(_text(data.split(b'\n', 1)[0][5:]))
+        if kind != 'tree':
+            raise GitError("{0}: not a tree".format(name))
+        pos = 0
+        while pos < len(data):
+            space = data.index(b' ', pos)
+            nul = data.index(b'\0', space)
+            entry_sha = data[nul + 1:nul + 21]
+            if not isinstance(entry_sha, str):
+                entry_sha = entry_sha.hex()
+            else:
+                entry_sha = entry_sha.encode('hex')
+            yield (_text(data[pos:space]), _text(data[space + 1:nul]),
+                   entry_sha)
+            pos = nul + 21
+
+    def walk(self, name, prefix=''):
+        """Yield `(path, sha)` for all files below tree `name`."""
+        for mode, path, sha in self.tree(name):
+            if mode == '40000':
+                for entry in self.walk(sha, prefix + path + '/'):
+                    yield entry
+            elif mode.startswith('100'):
+                # skips symbolic links and submodules.
+                yield prefix + path, sha
+
+
+def rev_list(spec, repo='.'):
+    """Return the commits in `spec`, oldest first.
+
+    A range `A..B` gives the commits reachable from B but not from A;
+    anything else is taken as a single revision.
+    """
+    if '..' not in spec:
+        return [spec]
+    output = subprocess.check_output(
+        ['git', 'rev-list', '--reverse', spec], cwd=repo)
+    return _text(output).split()
+
+
+class BlobSource(MemorySource):
+    """A module read from a git blob.  Sources for the same blob share
+    the same `key`, so that the blob is only analysed once.
+    """
+
+    def __init__(self, name, sha, data):
+        MemorySource.__init__(self, name, data)
+        self.key = 'git:' + sha
+
+
+def by_revision(file_records):
+    """Split `file_records`, mapping module names as given by
+    `expand` to records, into one mapping per revision, so that
+    project-wide rules see each revision on its own.
+    """
+    revisions = {}
+    for name, records in file_records.items():
+        revisions.setdefault(name.split(':', 1)[0], {})[name] = records
+    return list(revisions.values())
+
+
+def _normalise(path):
+    """Return `path` as a path in the tree of a commit, `''` for the
+    whole tree.
+    """
+    path = os.path.normpath(path).replace(os.sep, '/')
+    return '' if path == '.' else path.strip('/')
+
+
+def _below(path, prefixes):
+    """Return True if `path` is one of `prefixes` or inside one."""
+    return any(not prefix or path == prefix or
+               path.startswith(prefix + '/') for prefix in prefixes)
+
+
+def expand(specs, paths=(), repo='.'):
+    """Yield a `BlobSource` for every module in the revisions `specs`.
+
+    Modules are named `<commit>:<path>`.  If `paths` is given, only
+    modules below one of them are included; they are relative to the
+    top of the repository.  Each distinct blob is read from the
+    repository once.
+    """
+    paths = [_normalise(path) for path in paths]
+    catfile = CatFile(repo)
+    blobs = {}
+    try:
+        for spec in specs:
+            for rev in rev_list(spec, repo):
+                # peel annotated tags to the commit they point at.
+                commit = catfile.read(rev + '^{commit}')[0]
+                for path, sha in catfile.walk(commit):
+                    if not path.endswith('.py'):
+                        continue
+                    if paths and not _below(path, paths):
+                        continue
+                    if sha not in blobs:
+                        blobs[sha] = catfile.read(sha)[2]
+                    yield BlobSource(
+                        '{0}:{1}'.format(commit[:12], path), sha, blobs[sha])
+    finally:
+        catfile.close()
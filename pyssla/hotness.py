@@ -0,0 +1,94 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ranking of violations by the time spent in the functions they are
+in, according to a profile of the analysed code.
+"""
+
+import ast
+import os
+import pstats
+import re
+
+from . import ast_helpers
+
+
+def _components(name):
+    """Split the file name `name` into its path components.  The
+    names of archive members and git blobs are split at `!` and `:`
+    too, so that only their paths are compared.
+    """
+    return [part for part in re.split(r'[/\\!:]', name) if part]
+
+
+def load_profile(filename):
+    """Load a dump written by `cProfile` or `profile`, returning a
+    `Profile`.
+    """
+    times = {}
+    for (path, lineno, name), stat in pstats.Stats(filename).stats.items():
+        # builtins have no file.
+        if not lineno:
+            continue
+        by_line = times.setdefault(os.path.normpath(path), {})
+        by_line[lineno] = by_line.get(lineno, 0.0) + stat[3]
+    return Profile(times)
+
+
+class Profile(object):
+    """Cumulative times of profiled functions, by file and first line.
+
+    :ivar times: Maps file names, as profiled, to dicts mapping the
+        first lines of functions to their cumulative time in seconds.
+    """
+
+    def __init__(self, times):
+        self.times = times
+        self._by_basename = {}
+        for path in times:
+            self._by_basename.setdefault(
+                os.path.basename(path), []).append(path)
+
+    def lookup(self, filename):
+        """Return the times for analysed file `filename`.
+
+        The profile may have been taken elsewhere, so the profiled
+        file that has the most trailing path components in common
+        with `filename` is used.  Files whose directories differ, or
+        that match equally well, are not used; a file name without a
+        directory only matches if one profiled file has that name.
+        """
+        path = os.path.normpath(os.path.abspath(filename))
+        if path in self.times:
+            return self.times[path]
+        components = _components(filename)
+        candidates = self._by_basename.get(components[-1], ())
+        if len(components) == 1:
+            if len(candidates) == 1:
+                return self.times[candidates[0]]
+            return {}
+        best, best_count = None, 1
+        for candidate in candidates:
+            count = 0
+            for a, b in zip(reversed(components),
+                            reversed(_components(candidate))):
+                if a != b:
+                    break
+                count += 1
+            if count > best_count:
+                best, best_count = candidate, count
+            elif count == best_count:
+                # ambiguous, unless a later candidate matches better.
+                best = None
+        return self.times.get(best, {})
@@ -0,0 +1,106 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Structured result files, used to combine sharded runs."""
+
+import json
+
+from .checker import Message
+from . import hotness
+
+FORMAT_VERSION = 1
+
+
+def dump(filename, file_results, shard=None):
+    """Write the `pyssla.runner.FileResult`s in `file_results` to
+    `filename`.
+    """
+    messages = []
+    for result in file_results:
+        messages.extend(result.messages)
+    data = {
+        'version': FORMAT_VERSION,
+        'shard': shard and '{0}/{1}'.format(*shard),
+        'files': sorted(result.filename for result in file_results),
+        'errors': dict((result.filename, result.error)
+                       for result in file_results if result.error),
+        'records': dict((result.filename, result.records)
+                        for result in file_results if result.records),
+        'messages': [message.to_dict() for message in messages]
+        }
+    with open(filename, 'w') as filep:
+        json.dump(data, filep, indent=1, sort_keys=True)
+
+
+def load(filename):
+    """Read a result file written by `dump`."""
+    with open(filename) as filep:
+        data = json.load(filep)
+    if data.get('version') != FORMAT_VERSION:
+        raise ValueError("{0}: unsupported result format".format(filename))
+    data.setdefault('errors', {})
+    data.setdefault('records', {})
+    data['messages'] = [Message.from_dict(message)
+                        for message in data['messages']]
+    return data
+
+
+def check_shards(documents):
+    """Return a list of problems with the shard set in `documents`:
+    missing, duplicated or inconsistent shards.
+    """
+    problems = []
+    seen = {}
+    counts = set()
+    for document in documents:
+        if not document['shard']:
+            continue
+        index, count = [int(part) for part in document['shard'].split('/')]
+        counts.add(count)
+        seen[index] = seen.get(index, 0) + 1
+    if len(counts) > 1:
+        problems.append("shards disagree on the shard count: {0}".format(
+            ', '.join(str(count) for count in sorted(counts))))
+    for index, times in sorted(seen.items()):
+        if times > 1:
+            problems.append("shard {0} given {1} times".format(index, times))
+    if len(counts) == 1:
+        count = counts.pop()
+        for index in range(1, count + 1):
+            if index not in seen:
+                problems.append("shard {0}/{1} is missing".format(
+                    index, count))
+    return problems
+
+
+def merge(documents, rules=None):
+    """Combine the messages of several result documents into one
+    sorted list.
+
+    If a `pyssla.ruleset.RuleSet` is given, its project-wide rules
+    are run over the records of all documents.  Messages are ranked
+    by time, as with `--profile-data`, if they carry profile times.
+    """
+    messages = []
+    records = {}
+    for document in documents:
+        messages.extend(document['messages'])
+        records.update(document['records'])
+    if rules is not None:
+        messages.extend(rules.finish(records))
+    if any(message.cumtime is not None for message in messages):
+        return hotness.rank(messages)
+    messages.sort(key=Message.sort_key)
+    return messages
@@ -12,15 +12,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Analyses that rules can require, see `Rule.requires`.
+PARENTS = 'parents'
+SCOPES = 'scopes'
+TOKENS = 'tokens'
+SOURCE = 'source'
+PROJECT = 'project'
+
 
 class Rule(object):
     """
 
     :ivar types: A sequence of ast node types that this rule should be
         run for.
+    :ivar name: The name the rule was registered under.
+    :ivar requires: The analyses the rule depends on; only the ones
+        required by some enabled rule are computed.  `PARENTS` sets
+        `node.parent`, `SCOPES` runs the scope analysis, `SOURCE` and
+        `TOKENS` make `checker.source` and `checker.tokens` available
+        and `PROJECT` is needed for `finish` to be called.  Rules that
+        do not say are assumed to need parents and scopes.
     """
 
     types = []
+    name = None
+    requires = (PARENTS, SCOPES)
 
     def __init__(self, config):
         self.config = config
@@ -30,4 +46,37 @@ class Rule(object):
         pass
 
     def analyse(self, node, checker):
+        """Called for each node of one of `types`, once the whole tree
+        has been traversed and has parents and scopes.
+        """
+        pass
+
+    def enter(self, node, checker):
+        """Called for each node of one of `types` when the traversal
+        reaches it, before its children.  `checker.scope` is the scope
+        the node is in.
+        """
+        pass
+
+    def leave(self, node, checker):
+        """Called for each node of one of `types` after its children
+        have been traversed.
+
+        The module is left once the whole tree has been traversed and
+        its names resolved, so a rule can collect the nodes it needs
+        in `enter`, instead of walking the tree again, and report from
+        here.  Rules are shared between files, so such state should be
+        reset when entering the module.
+        """
+        pass
+
+    def finish(self, records, checker):
+        """Called once all files have been checked.
+
+        Rules that look at the project as a whole use
+        `Checker.record` while analysing each file and report their
+        findings from here.  `records` is a list of `(filename,
+        value)` pairs for the values recorded by this rule, and
+        violations are reported with `ProjectChecker.report`.
+        """
         pass
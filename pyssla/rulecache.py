@@ -0,0 +1,157 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""On-disk cache of what the rules found in each module.
+
+Results are keyed by a hash of the module source and the running
+Python version, and within that by rule: its name, configuration and
+the modification time of its code.  Changing the configuration of a
+rule, or enabling one, only runs that rule again; the others are
+taken from the cache.
+
+Trees are not cached: loading any serialised form of a tree in Python
+is slower than parsing the source again, and parsing is a small part
+of checking a module compared to the rules.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import platform
+import sys
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .checker import Message
+
+# Bump when the format of the entries changes.
+CACHE_VERSION = 2
+
+
+def _interpreter_tag():
+    return '{0}-{1}-{2}'.format(
+        platform.python_implementation().lower(),
+        ''.join(str(part) for part in sys.version_info[:3]),
+        CACHE_VERSION)
+
+
+def rule_key(rule, dedup=False):
+    """Return a string identifying the results of `rule`, which
+    changes with its configuration and its code.
+    """
+    module = sys.modules.get(type(rule).__module__)
+    try:
+        stamp = os.path.getmtime(module.__file__)
+    except (AttributeError, OSError):
+        stamp = None
+    # sets in the configuration are sorted so that the key is stable.
+    config = json.dumps(rule.config, sort_keys=True, default=sorted)
+    return '{0}:{1}:{2}:{3}:{4}'.format(
+        rule.name, type(rule).__name__, stamp, int(bool(dedup)), config)
+
+
+class RuleCache(object):
+    """Cache of rule results stored below `directory`."""
+
+    def __init__(self, directory):
+        self.directory = os.path.join(
+            directory, 'results', _interpreter_tag())
+
+    def _path(self, source):
+        if not isinstance(source, bytes):
+            source = source.encode('utf-8')
+        key = hashlib.sha1(source).hexdigest()
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def load(self, source):
+        """Return the cached results for `source`, a dict mapping the
+        `rule_key` of rules to their messages and records.
+        """
+        try:
+            with open(self._path(source), 'rb') as filep:
+                mapped = mmap.mmap(filep.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return {}
+        try:
+            return pickle.load(mapped)
+        except Exception:
+            # treat a corrupt entry as a miss; it is replaced on store.
+            return {}
+        finally:
+            mapped.close()
+
+    def store(self, source, entry):
+        """Store the results `entry` for `source`, see `load`."""
+        path = self._path(source)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        # write to a temporary file and rename so that concurrent
+        # readers never see a partial entry.
+        fd, tmppath = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as filep:
+            pickle.dump(entry, filep, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmppath, path)
+
+    def analyse(self, tree, source, filename, rules):
+        """Check module `tree`, parsed from `source`, with the
+        `pyssla.ruleset.RuleSet` `rules`, running only the rules whose
+        results are not cached.
+
+        Returns a checker holding the results of all the rules, with
+        the messages in line order.
+        """
+        entry = self.load(source)
+        keys = dict((rule.name, rule_key(rule, rules.dedup))
+                    for rule in rules.rules)
+        missing = [rule for rule in rules.rules if keys[rule.name] not in entry]
+        if missing:
+            checker = type(rules)(missing, dedup=rules.dedup).checker(
+                filename)
+            checker.analyse(tree, source)
+            messages = dict((rule.name, []) for rule in missing)
+            for message in checker.messages:
+                messages[message.rule].append(message.to_dict())
+            for rule in missing:
+                entry[keys[rule.name]] = (
+                    messages[rule.name],
+                    list(checker.records.get(rule.name, ())))
+            self.store(source, entry)
+
+        result = rules.checker(filename)
+        result.tree = tree
+        for rule in rules.rules:
+            messages, records = entry[keys[rule.name]]
+            if hasattr(result, 'counts'):
+                if messages:
+                    result.counts[rule.name] += len(messages)
+            else:
+                for data in messages:
+                    message = Message.from_dict(data)
+                    message.filename = filename
+                    result.messages.append(message)
+            if records:
+                result.records[rule.name] = list(records)
+        result.messages.sort(key=Message.sort_key)
+        return result
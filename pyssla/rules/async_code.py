@@ -0,0 +1,98 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rules for coroutines."""
+
+import ast
+
+from ..rule import Rule, PARENTS, SCOPES
+from .. import ast_helpers
+
+
+BLOCKING_FUNCTIONS = [
+    'time.sleep', 'open', 'io.open', 'input',
+    'os.system', 'os.popen', 'os.wait', 'os.waitpid',
+    'subprocess.run', 'subprocess.call', 'subprocess.check_call',
+    'subprocess.check_output', 'socket.create_connection',
+    'socket.gethostbyname', 'socket.getaddrinfo',
+    'urllib.request.urlopen', 'urllib2.urlopen',
+    'requests.get', 'requests.post', 'requests.put', 'requests.patch',
+    'requests.delete', 'requests.head', 'requests.request',
+    'sqlite3.connect', 'psycopg2.connect', 'pymysql.connect',
+    'MySQLdb.connect', 'redis.Redis', 'shutil.copyfile', 'shutil.copytree',
+    'shutil.rmtree']
+
+
+def _coroutine_of(call):
+    """Return the coroutine whose own body makes `call`, or `None` if
+    it is made elsewhere, such as in a nested function or class.
+    """
+    child, parent = call, call.parent
+    while parent is not None:
+        if isinstance(parent, ast_helpers.FUNCTION_TYPES +
+                      (ast.Lambda, ast.ClassDef)):
+            if isinstance(parent, ast_helpers.ASYNC_FUNCTION_TYPES) and \
+                    child in parent.body:
+                return parent
+            return None
+        child, parent = parent, parent.parent
+    return None
+
+
+class BlockingCallInAsyncRule(Rule):
+    """Calling a function that blocks, such as `time.sleep`, file or
+    socket I/O, `subprocess.run` or a synchronous HTTP or database
+    client, in a coroutine stops the whole event loop until it
+    returns.  Use the asynchronous counterpart, or run the call in an
+    executor with `loop.run_in_executor`.
+
+    Calls are matched against `functions` by their full names, so
+    that `from time import sleep` and `import time as t` are caught
+    too.
+    """
+
+    types = (ast.Module, ast.Call) + ast_helpers.ASYNC_FUNCTION_TYPES
+    requires = (PARENTS, SCOPES)
+
+    defaults = {
+        'functions': BLOCKING_FUNCTIONS
+        }
+
+    def _init_config(self, config):
+        self.functions = set(config['functions'])
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self._coroutines = []
+            self._calls = {}
+        elif isinstance(node, ast.Call):
+            coroutine = _coroutine_of(node)
+            if coroutine is not None:
+                self._calls[coroutine].append(node)
+        else:
+            self._coroutines.append(node)
+            self._calls[node] = []
+
+    def leave(self, node, checker):
+        if not isinstance(node, ast.Module):
+            return
+        for coroutine in self._coroutines:
+            calls = sorted(self._calls[coroutine],
+                           key=lambda call: (call.lineno, call.col_offset))
+            for call in calls:
+                name = ast_helpers.qualified_name(call.func, checker)
+                if name in self.functions:
+                    checker.report(
+                        call, "blocking call to '{0}' in coroutine '{1}'",
+                        name, coroutine.name)
@@ -15,7 +15,7 @@
 import ast
 import itertools
 
-from ..rule import Rule
+from ..rule import Rule, PARENTS, SCOPES
 from .. import ast_helpers
 from .. import pat
 from .. import analyser
@@ -27,6 +27,7 @@ class OneImportPerLineRule(Rule):
     """
 
     types = (ast.Import, ast.ImportFrom)
+    requires = ()
 
     defaults = {
         "enabled": False
@@ -58,20 +59,12 @@ class UseImportsForPackagesAndModulesOnlyRule(Rule):
     """
 
     types = (ast.Module,)
+    requires = (PARENTS, SCOPES)
 
     defaults = {
         "enabled": False
         }
 
-    def _binding(self, name):
-        """Find binding for `name`."""
-        node = name
-        while node is not None:
-            if hasattr(node, 'scope'):
-                if name.id in node.scope:
-                    return node.scope[name.id]
-            node = node.parent
-
     def analyse(self, node, checker):
         names = ast_helpers.ast_path(
             node, './/Name[isinstance(ctx, ast.Load)]')
@@ -80,11 +73,11 @@ class UseImportsForPackagesAndModulesOnlyRule(Rule):
         names = [name for name in names
                  if not isinstance(name.parent, ast.Attribute)]
         for name in names:
-            binding = self._binding(name)
+            binding = checker.binding_for(name)
             if isinstance(binding, analyser.Importation):
                 checker.report(
-                    name, "import package or module instead of '{}' (name imported at :{})".format(
-                        name.id, binding.source.lineno))
+                    name, "import package or module instead of '{0}' (name imported at :{1})",
+                    name.id, binding.source.lineno)
 
 
 class ExcessiveImportedNamesRule(Rule):
@@ -100,6 +93,7 @@ class ExcessiveImportedNamesRule(Rule):
 
     """
     types = (ast.Module,)
+    requires = ()
 
     defaults = {
         'threshold': 3
@@ -111,13 +105,15 @@ class ExcessiveImportedNamesRule(Rule):
     def analyse(self, node, checker):
         keyfunc = lambda node: node.module
         imports = ast_helpers.ast_path(node, './ImportFrom')
-        imports.sort(key=keyfunc)
+        # `from . import x` has no module.
+        imports.sort(key=lambda node: node.module or '')
         for module, imports in itertools.groupby(imports, keyfunc):
+            imports = list(imports)
             num_names = sum([len(child.names) for child in imports])
             if num_names >= self.threshold:
                 checker.report(
-                    child, "excessive name importing from module '{}'".format(
-                        module))
+                    imports[-1], "excessive name importing from module "
+                    "'{0}'", module)
 
 
 class NeverImportWildcardRule(Rule):
@@ -131,6 +127,7 @@ class NeverImportWildcardRule(Rule):
     """
 
     types = (ast.ImportFrom,)
+    requires = ()
 
     def analyse(self, node, checker):
         for alias in node.names:
@@ -145,6 +142,7 @@ class UseIsinstanceRule(Rule):
     """
 
     types = (ast.FunctionDef,)
+    requires = ()
     
     def _init_config(self, config):
         self.pat = pat.parse('_.__class__ == _')
@@ -160,6 +158,7 @@ class UseInDictNotInDictKeys(Rule):
     """Use `k in d` rather than `k in d.keys()` for dicts."""
 
     types = (ast.FunctionDef,)
+    requires = ()
     
     def _init_config(self, config):
         self.in_keys_pat = pat.parse('_ in _.keys()')
@@ -180,6 +179,7 @@ class IdiomaticModuleStructureRule(Rule):
     """Make sure that the module follow a some-what idiomatic structure."""
 
     types = (ast.Module,)
+    requires = ()
     order = [
         'module docstring',
         'import',
@@ -206,36 +206,17 @@ class IdiomaticModuleStructureRule(Rule):
                 after = self.order[:index]
                 if before and after:
                     checker.report(
-                        child, '{0} should come before {1} and after {2}'.format(
-                            cls, ', '.join(before), ', '.join(after)))
+                        child, '{0} should come before {1} and after {2}',
+                        cls, ', '.join(before), ', '.join(after))
                 elif before:
-                    checker.report(child, '%s should come last in module' % cls)
+                    checker.report(child, '{0} should come last in module', cls)
                 elif after:
-                    checker.report(child, '%s should come first in module' % cls)
+                    checker.report(child, '{0} should come first in module', cls)
 
     def _classify(self, child):
-        if isinstance(child, ast.Str):
-            return 'module docstring'
-        elif (isinstance(child, ast.Import) or
-              isinstance(child, ast.ImportFrom)):
-            return 'import'
-        elif isinstance(child, ast.Assign):
-            # allow internal constants everywhere
-            if (isinstance(child.targets[0], ast.Name) and
-                child.targets[0].id.startswith('_')):
-                return 'unknown'
-            return 'constant'
-        elif isinstance(child, ast.ClassDef):
-            if child.name.startswith("_"):
-                return 'internal function or class'
-            elif child.name.endswith("Error"):
-                return 'exception class'
-            else:
-                return 'class'
-        elif isinstance(child, ast.FunctionDef):
-            if child.name.startswith("_"):
-                return 'internal function or class'
-            else:
-                return 'interface function'
-        else:
+        cls = ast_helpers.classify_statement(child)
+        # allow internal constants, and statements that do not
+        # declare anything, everywhere.
+        if cls not in self.order:
             return 'unknown'
+        return cls
@@ -14,7 +14,7 @@
 
 import ast
 
-from ..rule import Rule
+from ..rule import Rule, PARENTS, SCOPES
 from .. import ast_helpers
 
 
@@ -31,6 +31,7 @@ class ChangingNameInClosureRule(Rule):
     """
 
     types = (ast.FunctionDef,)
+    requires = (PARENTS, SCOPES)
 
     def analyse(self, node, checker):
         closures = ast_helpers.ast_path(node, './/FunctionDef')
@@ -55,5 +56,5 @@ class ChangingNameInClosureRule(Rule):
                     source = source.parent
                 if source and seen_loop:
                     checker.report(
-                        name, "using possibly changing name '{}' in a closure".format(
-                            name.id))
+                        name, "using possibly changing name '{0}' in a closure",
+                        name.id)
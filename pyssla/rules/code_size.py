@@ -26,6 +26,7 @@ class ExcessivePublicMethodsRule(Rule):
     but also allows new variations to be developed easily.
     """
     types = (ast.ClassDef,)
+    requires = ()
 
     defaults = {
         'threshold': 20
@@ -36,12 +37,12 @@ class ExcessivePublicMethodsRule(Rule):
 
     def analyse(self, node, checker):
         fns = [stmt for stmt in node.body
-               if isinstance(stmt, ast.FunctionDef)
+               if isinstance(stmt, ast_helpers.FUNCTION_TYPES)
                and stmt.name[0] != '_']
         if len(fns) >= self.threshold:
             checker.report(
-                node, "excessive number of public methods: {0}".format(
-                    len(fns)))
+                node, "excessive number of public methods: {0}", len(fns),
+                value=len(fns))
 
 
 class ExcessiveArgumentListRule(Rule):
@@ -51,6 +52,7 @@ class ExcessiveArgumentListRule(Rule):
     """
 
     types = (ast.FunctionDef,)
+    requires = ()
 
     defaults = {
         'threshold': 10
@@ -63,11 +65,12 @@ class ExcessiveArgumentListRule(Rule):
         args = ast_helpers.collect_args(node)
         if len(args) >= self.threshold:
             checker.report(
-                node, "excessive argument list: {0} args".format(
-                    len(args)))
+                node, "excessive argument list: {0} args", len(args),
+                value=len(args))
 
 
 class _ExcessiveRule(Rule, ast.NodeVisitor):
+    requires = ()
 
     def visit(self, node):
         if hasattr(node, "lineno"):
@@ -82,7 +85,8 @@ class _ExcessiveRule(Rule, ast.NodeVisitor):
         return self.last - self.first
         if linecnt >= self.threshold:
             checker.report(
-                node, "excessive function length: {0} lines".format(linecnt))
+                node, "excessive function length: {0} lines".format(linecnt),
+                value=linecnt)
 
 
 class ExcessiveFunctionLengthRule(_ExcessiveRule):
@@ -107,7 +111,8 @@ class ExcessiveFunctionLengthRule(_ExcessiveRule):
         linecnt = _ExcessiveRule.analyse(self, node, checker)
         if linecnt >= self.threshold:
             checker.report(
-                node, "excessive function length: {0} lines".format(linecnt))
+                node, "excessive function length: {0} lines", linecnt,
+                value=linecnt)
 
 
 class ExcessiveClassLengthRule(_ExcessiveRule):
@@ -129,7 +134,8 @@ class ExcessiveClassLengthRule(_ExcessiveRule):
         linecnt = _ExcessiveRule.analyse(self, node, checker)
         if linecnt >= self.threshold:
             checker.report(
-                node, "excessive class length: {0} lines".format(linecnt))
+                node, "excessive class length: {0} lines", linecnt,
+                value=linecnt)
 
 
 class TooManyFieldsRule(Rule):
@@ -141,24 +147,19 @@ class TooManyFieldsRule(Rule):
     park them within a single Address field.
     """
     types = (ast.ClassDef,)
+    requires = ()
 
     defaults = {
         'threshold': 15
         }
 
-    path = (
-        "./FunctionDef[name=='__init__']"
-        "//Assign/Attribute[value.id=='self' and isinstance(ctx, ast.Store)]"
-        )
-
     def _init_config(self, config):
         self.threshold = config.get('threshold', 15)
 
     def analyse(self, node, checker):
-        c = len(ast_helpers.ast_path(node, self.path))
+        c = len(ast_helpers.self_attributes(node, '__init__'))
         if c >= self.threshold:
-            checker.report(
-                node, "too many fields: {0}".format(c))
+            checker.report(node, "too many fields: {0}", c, value=c)
 
 
 class TooManyMethods(Rule):
@@ -168,6 +169,7 @@ class TooManyMethods(Rule):
     """
 
     types = (ast.ClassDef,)
+    requires = ()
 
     defaults = {
         'threshold': 10
@@ -179,4 +181,4 @@ class TooManyMethods(Rule):
     def analyse(self, node, checker):
         c = len(ast_helpers.ast_path(node, "./FunctionDef"))
         if c >= self.threshold:
-            checker.report(node, "too many methods: {0}".format(c))
+            checker.report(node, "too many methods: {0}", c, value=c)
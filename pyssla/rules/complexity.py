@@ -14,22 +14,28 @@
 
 import ast
 
-from ..rule import Rule
+from ..rule import Rule, PARENTS
 from .. import ast_helpers
 
 
+# `try` with handlers, in Python 2 and 3.
+_TRY_TYPES = tuple(getattr(ast, name) for name in ('TryExcept', 'Try')
+                   if hasattr(ast, name))
+
+
 class _CyclomaticVisitor(ast.NodeVisitor):
     complexity = 0
 
     def visit(self, node):
         cls = node.__class__
-        if cls in (ast.TryExcept,):
+        if cls in _TRY_TYPES:
             self.complexity += len(node.handlers) + len(node.orelse)
         elif cls in (ast.BoolOp,):
             self.complexity += len(node.values) - 1
-        elif cls in (ast.Lambda, ast.With, ast.If, ast.IfExp, ast.Assert):
+        elif cls in (ast.Lambda, ast.If, ast.IfExp, ast.Assert) or \
+                cls in ast_helpers.WITH_TYPES:
             self.complexity += 1
-        elif cls in (ast.For, ast.While):
+        elif cls in ast_helpers.LOOP_TYPES:
             self.complexity += 1 + len(node.orelse) 
         ast.NodeVisitor.generic_visit(self, node)
 
@@ -45,6 +51,7 @@ class CyclomaticComplexityRule(Rule):
     is very high complexity.
     """
     types = (ast.FunctionDef,)
+    requires = ()
 
     defaults = {
         'threshold': 10
@@ -58,6 +65,241 @@ class CyclomaticComplexityRule(Rule):
         cv.visit(node)
         if cv.complexity >= self.threshold:
             checker.report(
-                node, "function is too cyclomatic complex: {0}".format(
-                    cv.complexity))
+                node, "function is too cyclomatic complex: {0}",
+                cv.complexity, value=cv.complexity)
+
+
+_ITERATION_WRAPPERS = ('enumerate', 'reversed', 'sorted', 'list', 'tuple',
+                       'iter', 'len')
+
+_LINEAR_METHODS = ('index', 'remove', 'count', 'insert')
+
+
+def _collection(node):
+    """Return the dotted name of the collection that iterating over
+    `node` goes through, e.g. `x` for `enumerate(x)` or `x.items()`.
+    """
+    while isinstance(node, ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in ('range', 'xrange'):
+            # only `range(len(x))` goes through a collection.
+            node = node.args[-1] if node.args else None
+            if not isinstance(node, ast.Call):
+                return None
+        elif isinstance(func, ast.Name) and \
+                func.id in _ITERATION_WRAPPERS and node.args:
+            node = node.args[0]
+        elif isinstance(func, ast.Attribute) and not node.args and \
+                func.attr in ('items', 'keys', 'values', 'iteritems',
+                              'iterkeys', 'itervalues'):
+            node = func.value
+        else:
+            return None
+    return ast_helpers.dotted_name(node)
+
+
+def _is_bounded(node):
+    """Return True if slice `node` has a constant length, as in
+    `x[:2]` or `x[i:i + 2]`.
+    """
+    if node.step is not None:
+        return False
+    if isinstance(node.upper, ast.Num):
+        return node.lower is None or isinstance(node.lower, ast.Num)
+    upper = node.upper
+    return (node.lower is not None and isinstance(upper, ast.BinOp) and
+            isinstance(upper.op, ast.Add) and
+            isinstance(upper.right, ast.Num) and
+            ast.dump(upper.left) == ast.dump(node.lower))
+
+
+_COMPREHENSION_TYPES = (ast.ListComp, ast.SetComp, ast.DictComp,
+                        ast.GeneratorExp)
+
+
+def _generator_collections(generators):
+    return [_collection(generator.iter) for generator in generators]
+
+
+def _enclosing_loops(node):
+    """Return `(function, collections)` for `node`, where `function`
+    is the function in whose own body `node` is, and `collections`
+    are the collections that the loops around `node` in it iterate
+    over, `None` for `while` loops.
+
+    `function` is `None` if `node` is not in the body of a function,
+    or is in a nested lambda or class.
+    """
+    collections = []
+    child, parent = node, node.parent
+    while parent is not None:
+        if isinstance(parent, ast_helpers.FUNCTION_TYPES):
+            return (parent if child in parent.body else None), collections
+        elif isinstance(parent, (ast.Lambda, ast.ClassDef)):
+            return None, collections
+        elif isinstance(parent, ast.comprehension):
+            # the iterable of a generator is evaluated in the loops of
+            # the generators before it, the rest in its own loop too.
+            comprehension = parent.parent
+            index = comprehension.generators.index(parent)
+            if child is not parent.iter:
+                index += 1
+            collections.extend(_generator_collections(
+                    comprehension.generators[:index]))
+            parent = comprehension
+        elif isinstance(parent, _COMPREHENSION_TYPES):
+            collections.extend(_generator_collections(parent.generators))
+        elif isinstance(parent, ast_helpers.FOR_TYPES):
+            if child is not parent.iter and child not in parent.orelse:
+                collections.append(_collection(parent.iter))
+        elif isinstance(parent, ast.While):
+            if child not in parent.orelse:
+                collections.append(None)
+        child, parent = parent, parent.parent
+    return None, collections
+
+
+def _position(item):
+    node = item[0]
+    return (node.lineno, getattr(node, 'col_offset', 0))
+
+
+class _FunctionLoops(object):
+    """The loops in the body of a function, and the linear work and
+    nested loops over the same collection in them.
+    """
+
+    def __init__(self):
+        self.lists = set()
+        self.loops = []
+        self.nested = []
+        self.linear = []
+
+
+class AlgorithmicComplexityRule(Rule):
+    """Estimates how the running time of a function grows with the
+    size of its input, as O(n^k) where k is the deepest nesting of
+    loops (comprehensions and generator expressions included), plus
+    one for linear operations done in a loop: `list.index()`,
+    `list.remove()`, `in` on a list variable, copying slices and the like.
+
+    Functions are reported when k is at least `threshold`, or when
+    they are at least quadratic because of a linear operation in a
+    loop or a nested loop over the same collection, which is often
+    accidental.  Methods and `in` only count on variables that the
+    function assigns a list to.
+    """
+    types = (ast.Module, ast.FunctionDef, ast.For, ast.While,
+             ast.comprehension, ast.Call, ast.Compare, ast.Subscript,
+             ast.Assign)
+    requires = (PARENTS,)
+
+    defaults = {
+        'threshold': 3,
+        'max_reasons': 5
+        }
+
+    def _init_config(self, config):
+        self.threshold = config.get('threshold', 3)
+        self.max_reasons = config.get('max_reasons', 5)
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self._functions = {}
+            return
+        if isinstance(node, ast_helpers.FUNCTION_TYPES):
+            self._functions[node] = _FunctionLoops()
+            return
+        if isinstance(node, ast.comprehension):
+            # the loop of each generator is counted on its own, inside
+            # those of the generators before it.
+            loop, collection = node.parent, _collection(node.iter)
+            function, collections = _enclosing_loops(loop)
+            collections.extend(_generator_collections(
+                    loop.generators[:loop.generators.index(node)]))
+        else:
+            function, collections = _enclosing_loops(node)
+            loop = node
+            collection = _collection(node.iter) \
+                if isinstance(node, ast_helpers.FOR_TYPES) else None
+        if function is None:
+            return
+        loops = self._functions[function]
+        if isinstance(node, ast_helpers.LOOP_TYPES + (ast.comprehension,)):
+            loops.loops.append((loop, len(collections) + 1))
+            if collection is not None and collection in collections:
+                loops.nested.append((loop, collection))
+        elif isinstance(node, ast.Assign):
+            if isinstance(node.value, (ast.List, ast.ListComp)):
+                loops.lists.update(target.id for target in node.targets
+                                   if isinstance(target, ast.Name))
+        elif collections:
+            for what, receiver in self._linear(node):
+                loops.linear.append(
+                    (node, what, len(collections) + 1, receiver))
+
+    def _linear(self, node):
+        """Yield `(what, receiver)` for the linear work done by `node`,
+        where `receiver` is the name of the list the work is done on,
+        if it must be a list to be linear.
+        """
+        if isinstance(node, ast.Call):
+            func = node.func
+            # only methods of list variables are known to be linear,
+            # not e.g. `os.remove()` or `str.index()`.
+            if isinstance(func, ast.Attribute) and \
+                    isinstance(func.value, ast.Name):
+                if func.attr in _LINEAR_METHODS:
+                    yield '{0}()'.format(func.attr), func.value.id
+                elif func.attr == 'pop' and node.args and \
+                        isinstance(node.args[0], ast.Num) and \
+                        node.args[0].n == 0:
+                    yield 'pop(0)', func.value.id
+        elif isinstance(node, ast.Compare):
+            for op, comparator in zip(node.ops, node.comparators):
+                # a list literal has a constant size.
+                if isinstance(op, (ast.In, ast.NotIn)) and \
+                        isinstance(comparator, ast.Name):
+                    yield "'in' on a list", comparator.id
+        elif isinstance(node.slice, ast.Slice) and \
+                isinstance(node.ctx, ast.Load) and \
+                not _is_bounded(node.slice):
+            yield 'slice copy', None
+
+    def leave(self, node, checker):
+        if isinstance(node, ast_helpers.FUNCTION_TYPES):
+            self._check(node, self._functions.pop(node), checker)
+
+    def _check(self, node, loops, checker):
+        # the order of the traversal differs from the source within
+        # loops and comprehensions.
+        loops.loops.sort(key=_position)
+        max_depth, deepest = 0, None
+        for loop, depth in loops.loops:
+            if depth > max_depth:
+                max_depth, deepest = depth, loop.lineno
+        linear = [(child.lineno, what, order)
+                  for child, what, order, receiver in sorted(
+                      loops.linear, key=_position)
+                  if receiver is None or receiver in loops.lists]
+        nested = [(loop.lineno, collection) for loop, collection in sorted(
+                loops.nested, key=_position)]
+        k = max([max_depth] + [order for lineno, what, order in linear])
+        if k < 2 or (k < self.threshold and not nested and not linear):
+            return
 
+        reasons = []
+        if max_depth >= 2:
+            reasons.append('loops nested {0} deep at line {1}'.format(
+                    max_depth, deepest))
+        for lineno, collection in nested:
+            reasons.append("nested loop over '{0}' at line {1}".format(
+                    collection, lineno))
+        for lineno, what, order in linear:
+            reasons.append('{0} in a loop at line {1}'.format(what, lineno))
+        if len(reasons) > self.max_reasons:
+            reasons[self.max_reasons:] = ['{0} more'.format(
+                    len(reasons) - self.max_reasons)]
+        checker.report(
+            node, "estimated complexity O(n^{0}): {1}", k, '; '.join(reasons),
+            value=k)
@@ -0,0 +1,123 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import ast
+import hashlib
+from collections import defaultdict
+
+from ..rule import Rule, PROJECT
+
+
+def _digest(node, found, threshold):
+    """Compute the structural digest of `node` bottom-up.
+
+    Identifiers and constants are abstracted away, so two subtrees
+    get the same digest if they only differ in names and literal
+    values.  Statements of at least `threshold` nodes are appended to
+    `found` as `(digest, size, first line, last line)`.
+
+    Returns `(digest, size, last line)` for `node`.
+    """
+    parts = [node.__class__.__name__]
+    size = 1
+    last = getattr(node, 'lineno', 0)
+    for name, value in ast.iter_fields(node):
+        if isinstance(value, ast.AST):
+            values = [value]
+            parts.append('(')
+        elif isinstance(value, list):
+            values = value
+            parts.append('[')
+        else:
+            parts.append('-' if value is None else '*')
+            continue
+        for child in values:
+            if isinstance(child, ast.AST):
+                digest, child_size, child_last = _digest(
+                    child, found, threshold)
+                parts.append(digest)
+                size += child_size
+                last = max(last, child_last)
+            else:
+                parts.append('*')
+        parts.append(')')
+    if len(parts) == 1:
+        # leaf nodes such as contexts and operators.
+        return parts[0], size, last
+    digest = hashlib.md5(' '.join(parts).encode('ascii')).hexdigest()[:16]
+    if isinstance(node, ast.stmt) and size >= threshold:
+        found.append((digest, size, node.lineno, last))
+    return digest, size, last
+
+
+class DuplicateCodeRule(Rule):
+    """Duplicated code is harder to maintain since every change has
+    to be made in all copies.  Consider moving the code into a
+    function that is used from all places.
+
+    Statements are compared structurally, ignoring names and literal
+    values, across all analysed files.  Only statements of at least
+    `threshold` syntax tree nodes are considered.
+    """
+
+    types = (ast.Module,)
+    requires = (PROJECT,)
+
+    defaults = {
+        'threshold': 50,
+        'max_locations': 5
+        }
+
+    def _init_config(self, config):
+        self.threshold = config.get('threshold', 50)
+        self.max_locations = config.get('max_locations', 5)
+
+    def analyse(self, node, checker):
+        found = []
+        _digest(node, found, self.threshold)
+        for entry in found:
+            checker.record(entry)
+
+    def finish(self, records, checker):
+        groups = defaultdict(list)
+        for filename, (digest, size, first, last) in records:
+            groups[digest].append((filename, first, last, size))
+        groups = [group for group in groups.values() if len(group) > 1]
+        # report the largest clones first, and skip copies that lie
+        # within an already reported copy.
+        groups.sort(key=lambda group: (-group[0][3], sorted(group)))
+        covered = defaultdict(list)
+        for group in groups:
+            copies = sorted(
+                (filename, first, last, size)
+                for filename, first, last, size in group
+                if not any(start <= first and last <= end
+                           for start, end in covered[filename]))
+            if len(copies) < 2:
+                continue
+            for filename, first, last, size in copies:
+                covered[filename].append((first, last))
+            for filename, first, last, size in copies:
+                others = ['{0}:{1}'.format(other[0], other[1])
+                          for other in copies
+                          if other[:2] != (filename, first)]
+                if len(others) > self.max_locations:
+                    others[self.max_locations:] = ['{0} more'.format(
+                        len(others) - self.max_locations)]
+                others = ', '.join(others)
+                checker.report(
+                    filename, first,
+                    "duplicated code of {0} nodes (lines {1}-{2}), also at {3}",
+                    size, first, last, others, value=size)
@@ -0,0 +1,327 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rules for work done when a module is imported."""
+
+import ast
+
+from ..rule import Rule, PARENTS, SCOPES
+from .. import analyser
+from .. import ast_helpers
+
+
+HEAVY_MODULES = ['numpy', 'pandas', 'scipy', 'matplotlib', 'sklearn',
+                 'sympy', 'tensorflow', 'torch', 'boto3']
+
+ALLOWED_CALLS = ['namedtuple', 'collections.namedtuple', 'getLogger',
+                 'logging.getLogger', 'object', 'property', 'staticmethod',
+                 'classmethod', 'dict', 'list', 'set', 'frozenset', 'tuple',
+                 'int', 'float', 'str', 'bool', 'bytes', 'bytearray',
+                 'unicode', 'len', 'range', 'xrange', 'enumerate', 'zip',
+                 'type', 'super', 'hasattr', 'getattr', 'setattr',
+                 'isinstance', 'issubclass', 'callable', 'globals', 'vars',
+                 'repr', 'chr', 'ord', 'id', 'min', 'max',
+                 '__all__.append', '__all__.extend', 'enum.auto',
+                 'TypeVar', 'typing.TypeVar', 'NewType', 'typing.NewType',
+                 'threading.Lock', 'threading.RLock', 're.compile',
+                 'os.path.join', 'os.path.dirname', 'os.path.abspath',
+                 'os.path.basename', 'os.environ.get', 'os.getenv',
+                 'atexit.register', 'warnings.filterwarnings',
+                 'warnings.simplefilter']
+
+IO_CALLS = frozenset(['open', 'file', 'codecs.open', 'io.open', 'os.listdir',
+                      'os.walk', 'os.system', 'os.popen', 'os.stat',
+                      'glob.glob', 'subprocess.call', 'subprocess.check_call',
+                      'subprocess.check_output', 'subprocess.Popen',
+                      'urllib.urlopen', 'urllib2.urlopen',
+                      'urllib.request.urlopen', 'requests.get',
+                      'requests.post', 'requests.request', 'socket.socket',
+                      'socket.create_connection', 'sqlite3.connect',
+                      'json.load', 'pickle.load', 'yaml.load',
+                      'yaml.safe_load'])
+
+MAX_LITERAL_SIZE = 1000
+
+# weights of the kinds of work in the estimated import-time cost.
+WEIGHTS = {
+    'call': 1,
+    'literal': 5,
+    'I/O': 10,
+    'heavy import': 10
+    }
+
+
+def _literal_size(node):
+    """Return the number of elements in literal `node`, counting
+    the elements of nested literals.
+    """
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        children = node.elts
+    elif isinstance(node, ast.Dict):
+        children = node.keys + node.values
+    else:
+        return 1
+    return sum(_literal_size(child) for child in children) or 1
+
+
+_WORK_TYPES = (ast.Call, ast.List, ast.Tuple, ast.Set, ast.Dict)
+
+_IMPORT_TYPES = (ast.Import, ast.ImportFrom)
+
+
+def _run_at_import(node):
+    """Return the innermost statement around `node` if it runs when
+    the module is imported, or `None`.
+
+    That is the module body, including blocks of compound statements
+    and class bodies, but not functions, lambdas, generators or an
+    `if __name__ == '__main__'` block.
+    """
+    stmt = None
+    child, parent = node, node
+    while not isinstance(parent, ast.Module):
+        if isinstance(parent, ast_helpers.FUNCTION_TYPES +
+                      (ast.Lambda, ast.GeneratorExp)):
+            return None
+        if isinstance(parent, ast.ExceptHandler) and \
+                child not in parent.body:
+            return None
+        if isinstance(parent, ast.stmt):
+            if ast_helpers.classify_statement(parent) == 'main block':
+                return None
+            if stmt is None:
+                stmt = parent
+        child, parent = parent, parent.parent
+    # the bases and decorators of a class are not counted.
+    if isinstance(stmt, ast.ClassDef):
+        return None
+    return stmt
+
+
+def import_time_work(work, checker, allowed_calls, max_literal_size):
+    """Yield `(node, kind, detail)` for the work that a module does
+    when imported, at most one per statement.
+
+    `work` is the `(statement, node)` pairs of the calls and literals
+    run at import, in the order of the tree.  `kind` is 'I/O',
+    'literal' or 'call'; `detail` is the called name, following
+    imports, or the number of literal elements.
+    """
+    statements = []
+    found = {}
+    for stmt, node in work:
+        if stmt not in found:
+            statements.append(stmt)
+            found[stmt] = None
+        current = found[stmt]
+        if current is not None and current[1] == 'I/O':
+            continue
+        if isinstance(node, ast.Call):
+            written = ast_helpers.dotted_name(node.func)
+            name = ast_helpers.qualified_name(node.func, checker) or \
+                written or '<expression>'
+            if name in IO_CALLS:
+                found[stmt] = (node, 'I/O', name)
+            elif name not in allowed_calls and \
+                    written not in allowed_calls and current is None:
+                found[stmt] = (node, 'call', name)
+        else:
+            size = _literal_size(node)
+            if size >= max_literal_size and (
+                    current is None or current[1] == 'call'):
+                found[stmt] = (node, 'literal', size)
+    for stmt in statements:
+        if found[stmt] is not None:
+            yield found[stmt]
+
+
+def heavy_imports(imports, heavy_modules):
+    """Yield `(node, name, module_name)` for each of the import
+    statements `imports` that imports one of `heavy_modules`, or a
+    module in them.
+    """
+    for stmt in imports:
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if alias.name.split('.')[0] in heavy_modules:
+                    yield stmt, alias.asname or alias.name.split('.')[0], \
+                        alias.name
+        elif stmt.module and not stmt.level:
+            if stmt.module.split('.')[0] in heavy_modules:
+                for alias in stmt.names:
+                    yield stmt, alias.asname or alias.name, stmt.module
+
+
+class _ImportTimeRule(Rule):
+    """Base for rules about what a module does when it is imported.
+
+    The calls and literals (if `types` has `_WORK_TYPES`) and imports
+    (if it has `_IMPORT_TYPES`) that run at import are collected in
+    `work` and `imports` during the traversal, and `check` is called
+    with them once the module is left.
+    """
+
+    requires = (PARENTS, SCOPES)
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self.work = []
+            self.imports = []
+            return
+        if isinstance(checker.scope, analyser.FunctionScope):
+            # a quick test for the common case.
+            return
+        stmt = _run_at_import(node)
+        if stmt is None:
+            return
+        if isinstance(node, _IMPORT_TYPES):
+            self.imports.append(node)
+        else:
+            self.work.append((stmt, node))
+
+    def leave(self, node, checker):
+        if isinstance(node, ast.Module):
+            self.check(node, checker)
+
+    def check(self, node, checker):
+        raise NotImplementedError()
+
+
+class ImportTimeSideEffectRule(_ImportTimeRule):
+    """Work done at module level, such as calling functions, reading
+    files or building large literals, is done every time the module is
+    imported and slows down the start of every program using it, even
+    when the result is never needed.  Do it lazily instead, when it is
+    first needed.
+
+    Calls to the functions in `allowed_calls`, which are cheap and
+    commonly used to declare things, are not reported.
+    """
+
+    types = (ast.Module,) + _WORK_TYPES
+
+    defaults = {
+        'allowed_calls': ALLOWED_CALLS,
+        'max_literal_size': MAX_LITERAL_SIZE
+        }
+
+    def _init_config(self, config):
+        self.allowed_calls = set(config['allowed_calls'])
+        self.max_literal_size = config['max_literal_size']
+
+    def check(self, node, checker):
+        for child, kind, detail in import_time_work(
+                self.work, checker, self.allowed_calls, self.max_literal_size):
+            if kind == 'I/O':
+                checker.report(
+                    child, "I/O with '{0}' at import time", detail)
+            elif kind == 'literal':
+                checker.report(
+                    child, "literal of {0} elements built at import time",
+                    detail, value=detail)
+            else:
+                checker.report(
+                    child, "call to '{0}' at import time", detail)
+
+
+class HeavyImportRule(_ImportTimeRule):
+    """Importing a large package such as `numpy` or `pandas` can take
+    a considerable part of a second.  If a module only uses it inside
+    functions, import it in those functions so that the cost is only
+    paid when they are called.
+    """
+
+    types = (ast.Module,) + _IMPORT_TYPES
+
+    defaults = {
+        'modules': HEAVY_MODULES
+        }
+
+    def _init_config(self, config):
+        self.modules = set(config['modules'])
+
+    def _deferrable(self, binding, stmt):
+        """Return True if `binding` was made by `stmt` and is only
+        used in functions.
+        """
+        if not isinstance(binding, analyser.Importation) or \
+                binding.source is not stmt or not binding.uses:
+            return False
+        return all(isinstance(scope, analyser.FunctionScope)
+                   for scope, use in binding.uses)
+
+    def check(self, node, checker):
+        imports = []
+        deferrable = {}
+        for stmt, name, module in heavy_imports(self.imports, self.modules):
+            key = (stmt, module)
+            if key not in deferrable:
+                imports.append(key)
+                deferrable[key] = True
+            if not self._deferrable(node.scope.get(name), stmt):
+                deferrable[key] = False
+        for stmt, module in imports:
+            if deferrable[stmt, module]:
+                checker.report(
+                    stmt, "heavy module '{0}' is only used in functions, "
+                    "import it where it is used", module)
+
+
+class ImportTimeCostRule(_ImportTimeRule):
+    """Estimates what importing a module costs from the work it does
+    at module level (see `import-time-side-effect`) and the heavy
+    packages it imports (see `heavy-import`), and reports modules
+    whose estimate is over `threshold`.
+
+    Each call counts 1, each large literal 5, and each I/O call or
+    heavy import 10.
+    """
+
+    types = (ast.Module,) + _WORK_TYPES + _IMPORT_TYPES
+
+    defaults = {
+        'threshold': 25,
+        'allowed_calls': ALLOWED_CALLS,
+        'max_literal_size': MAX_LITERAL_SIZE,
+        'heavy_modules': HEAVY_MODULES
+        }
+
+    def _init_config(self, config):
+        self.threshold = config['threshold']
+        self.allowed_calls = set(config['allowed_calls'])
+        self.max_literal_size = config['max_literal_size']
+        self.heavy_modules = set(config['heavy_modules'])
+
+    def check(self, node, checker):
+        counts = dict((kind, 0) for kind in WEIGHTS)
+        found = []
+        for child, kind, detail in import_time_work(
+                self.work, checker, self.allowed_calls, self.max_literal_size):
+            counts[kind] += 1
+            found.append(child)
+        seen = set()
+        for stmt, name, module in heavy_imports(
+                self.imports, self.heavy_modules):
+            if module not in seen:
+                seen.add(module)
+                counts['heavy import'] += 1
+                found.append(stmt)
+        cost = sum(WEIGHTS[kind] * count for kind, count in counts.items())
+        if cost > self.threshold:
+            first = min(found, key=lambda child: child.lineno)
+            checker.report(
+                first, "estimated import-time cost of {0} ({1} calls, "
+                "{2} I/O, {3} large literals, {4} heavy imports)", cost,
+                counts['call'], counts['I/O'], counts['literal'],
+                counts['heavy import'], value=cost)
@@ -0,0 +1,438 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rules for the memory used by objects."""
+
+import ast
+
+from ..rule import Rule, PARENTS, SCOPES
+from .. import analyser
+from .. import ast_helpers
+
+
+# names whose use means that instances need a `__dict__`.
+_DYNAMIC_NAMES = frozenset(['__dict__', '__setattr__', '__getattr__',
+                            '__getattribute__', 'setattr', 'vars',
+                            '__weakref__'])
+
+
+_CONTAINER_CALLS = frozenset([
+    'dict', 'list', 'set', 'defaultdict', 'OrderedDict', 'Counter', 'deque',
+    'collections.defaultdict', 'collections.OrderedDict',
+    'collections.Counter', 'collections.deque'])
+
+_GROW_METHODS = frozenset(['append', 'appendleft', 'extend', 'extendleft',
+                           'insert', 'add', 'update', 'setdefault'])
+
+_SHRINK_METHODS = frozenset(['pop', 'popleft', 'popitem', 'remove', 'discard',
+                             'clear', 'difference_update',
+                             'intersection_update', '__delitem__'])
+
+GROW, SHRINK = 'grow', 'shrink'
+
+
+def _declared_slots(node):
+    """Return the names in the `__slots__` of class `node`, `()` if
+    they cannot be determined, or `None` if it has no `__slots__`.
+    """
+    for stmt in node.body:
+        if not isinstance(stmt, ast.Assign):
+            continue
+        if not any(isinstance(target, ast.Name) and
+                   target.id == '__slots__' for target in stmt.targets):
+            continue
+        value = stmt.value
+        if isinstance(value, ast.Str):
+            return (value.s,)
+        if isinstance(value, (ast.Tuple, ast.List)):
+            return tuple(elt.s for elt in value.elts
+                         if isinstance(elt, ast.Str))
+        return ()
+    return None
+
+
+def _class_names(node):
+    """Return the names bound in the body of class `node`."""
+    names = set()
+    for stmt in node.body:
+        if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+            names.add(stmt.name)
+        elif isinstance(stmt, ast.Assign):
+            for target in stmt.targets:
+                names.update(child.id for child in ast.walk(target)
+                             if isinstance(child, ast.Name))
+    return names
+
+
+def _is_self(node):
+    return isinstance(node, ast.Name) and node.id == 'self'
+
+
+class _ClassFacts(object):
+    """What the traversal finds in a module-level class.
+
+    :ivar dynamic: Whether the class uses its instance dictionary, or
+        sets attributes by name.
+    :ivar stored: The names of all `self.<attr>` stored to in any way
+        in the class.
+    :ivar initialised: The names of the `self.<attr>` that `__init__`
+        assigns, in order.
+    """
+
+    def __init__(self):
+        self.dynamic = False
+        self.stored = set()
+        self.initialised = []
+
+
+class UseSlotsRule(Rule):
+    """Every instance of a class without `__slots__` carries a
+    dictionary for its attributes, which takes considerably more
+    memory than the attributes themselves.  For classes with many
+    instances, list the attributes in `__slots__` instead.
+
+    A class is reported if all the attributes of its instances are
+    assigned in `__init__`, it does not set attributes by name or use
+    its `__dict__`, and it derives from `object` or from classes in
+    the same module that have, or could have, `__slots__`.  Only the
+    attributes not in the slots of base classes are suggested.
+    Classes whose instances have no attributes are not reported.
+
+    Instances of classes with `__slots__` cannot be weakly referenced
+    unless `'__weakref__'` is added to the slots.
+    """
+
+    types = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.Assign,
+             ast.Attribute, ast.Name)
+    requires = ()
+
+    defaults = {
+        'enabled': False
+        }
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self._facts = {}
+            self._stack = []
+            return
+        facts = self._facts.get(self._stack[0]) if self._stack else None
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            if not self._stack and isinstance(node, ast.ClassDef):
+                self._facts[node] = _ClassFacts()
+            self._stack.append(node)
+        if facts is None:
+            return
+        if isinstance(node, ast.Name):
+            name = node.id
+        elif isinstance(node, ast.Attribute):
+            name = node.attr
+            if _is_self(node.value) and not isinstance(node.ctx, ast.Load):
+                facts.stored.add(node.attr)
+        elif isinstance(node, ast.Assign):
+            name = None
+            if self._in_init():
+                for target in node.targets:
+                    if isinstance(target, ast.Attribute) and \
+                            _is_self(target.value) and \
+                            target.attr not in facts.initialised:
+                        facts.initialised.append(target.attr)
+        else:
+            name = getattr(node, 'name', None)
+        if name in _DYNAMIC_NAMES and not isinstance(node, ast.ClassDef):
+            facts.dynamic = True
+
+    def _in_init(self):
+        """Return True in `__init__` of the current class."""
+        return (len(self._stack) > 1 and
+                isinstance(self._stack[1], ast.FunctionDef) and
+                self._stack[1].name == '__init__' and
+                self._stack[1] in self._stack[0].body)
+
+    def leave(self, node, checker):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            self._stack.pop()
+        elif isinstance(node, ast.Module):
+            self._report(node, checker)
+
+    def _report(self, node, checker):
+        classes = dict((stmt.name, stmt) for stmt in node.body
+                       if isinstance(stmt, ast.ClassDef))
+        slots = {}
+
+        def all_slots(cls):
+            """Return all slots of instances of `cls`, including the
+            inherited ones, or `None` if the instances have a
+            `__dict__`.
+            """
+            if cls.name not in slots:
+                # guards against cycles through redefined names.
+                slots[cls.name] = None
+                slots[cls.name] = self._slots(cls, classes, all_slots)
+            return slots[cls.name]
+
+        for cls in classes.values():
+            all_slots(cls)
+        for name, cls in sorted(classes.items(),
+                                key=lambda item: item[1].lineno):
+            if _declared_slots(cls) is not None or not slots[name]:
+                continue
+            own = self._own_attributes(cls, classes, all_slots)
+            checker.report(
+                cls, "class '{0}' could use __slots__ = {1} to save "
+                "memory", name, repr(own))
+
+    def _base_slots(self, cls, classes, all_slots):
+        """Return the slots inherited by `cls`, or `None`."""
+        if not cls.bases:
+            # an old-style class in Python 2.
+            return None
+        inherited = set()
+        for base in cls.bases:
+            if isinstance(base, ast.Name) and base.id == 'object':
+                continue
+            if not isinstance(base, ast.Name) or base.id not in classes:
+                return None
+            base_slots = all_slots(classes[base.id])
+            if base_slots is None:
+                return None
+            inherited.update(base_slots)
+        return inherited
+
+    def _own_attributes(self, cls, classes, all_slots):
+        """Return the attributes that `__init__` of `cls` assigns and
+        that are not inherited, in the order they are assigned.
+        """
+        inherited = self._base_slots(cls, classes, all_slots)
+        return tuple(name for name in self._facts[cls].initialised
+                     if name not in inherited)
+
+    def _slots(self, cls, classes, all_slots):
+        inherited = self._base_slots(cls, classes, all_slots)
+        if inherited is None or cls.decorator_list:
+            return None
+        declared = _declared_slots(cls)
+        if declared is not None:
+            if '__dict__' in declared:
+                return None
+            return inherited | set(declared)
+        if self._facts[cls].dynamic:
+            return None
+        own = set(self._own_attributes(cls, classes, all_slots))
+        if not self._facts[cls].stored <= own | inherited:
+            # attributes are set outside of `__init__`, or in ways
+            # we do not follow.
+            return None
+        if own & _class_names(cls):
+            # would conflict with the class attributes.
+            return None
+        return inherited | own
+
+
+def _is_sequence(value):
+    """Return True if `value` creates a list or deque."""
+    return isinstance(value, (ast.List, ast.ListComp)) or (
+        isinstance(value, ast.Call) and
+        ast_helpers.dotted_name(value.func) in (
+            'list', 'deque', 'collections.deque'))
+
+
+def _is_container(value):
+    """Return True if `value` evidently creates a mutable container
+    without a size limit.
+    """
+    if isinstance(value, (ast.List, ast.Dict, ast.Set, ast.ListComp,
+                          ast.SetComp, ast.DictComp)):
+        return True
+    if isinstance(value, ast.Call):
+        name = ast_helpers.dotted_name(value.func)
+        if name in _CONTAINER_CALLS:
+            # a deque can be given a maximum length.
+            return not (name.endswith('deque') and
+                        (len(value.args) > 1 or value.keywords))
+    return False
+
+
+def _is_none(node):
+    """Return True if `node` is the constant `None`."""
+    if isinstance(node, ast.Name):
+        return node.id == 'None'
+    # `ast.NameConstant` in Python 3.4 to 3.7, `ast.Constant` later.
+    return node is not None and \
+        node.__class__.__name__ in ('NameConstant', 'Constant') and \
+        node.value is None
+
+
+def _function_of(node):
+    """Return the function that `node` is in, or `None`."""
+    node = node.parent
+    while node is not None:
+        if isinstance(node, ast_helpers.FUNCTION_TYPES + (ast.Lambda,)):
+            return node
+        node = node.parent
+    return None
+
+
+def _operation(ref, sequence):
+    """Return `GROW` or `SHRINK` if `ref`, a reference to a container,
+    is used to add to or remove from it, otherwise `None`.
+
+    Assigning to an item of a `sequence` replaces an item rather than
+    adding one.
+    """
+    parent = ref.parent
+    if isinstance(parent, ast.Subscript) and parent.value is ref:
+        if isinstance(parent.ctx, ast.Del) or \
+                isinstance(parent.slice, ast.Slice):
+            return SHRINK
+        if not isinstance(parent.ctx, ast.Load) and not sequence:
+            return GROW
+    elif isinstance(parent, ast.Attribute) and parent.value is ref and \
+            isinstance(parent.parent, ast.Call) and \
+            parent.parent.func is parent:
+        if parent.attr in _GROW_METHODS:
+            return GROW
+        if parent.attr in _SHRINK_METHODS:
+            return SHRINK
+    elif isinstance(parent, ast.AugAssign) and parent.target is ref:
+        return GROW
+    return None
+
+
+class UnboundedGrowthRule(Rule):
+    """Containers at module or class level live as long as the
+    process.  If functions keep adding to one without anything ever
+    removing from it, it grows without bounds, which in a long-running
+    process is a memory leak.  The same goes for memoising a function
+    with `functools.lru_cache(maxsize=None)` or `functools.cache`;
+    on methods, such a cache also keeps every instance alive.
+
+    A container counts as shrunk if anything in the module removes
+    from it, clears it, or assigns it anew in a function.
+    """
+
+    types = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.Attribute)
+    requires = (PARENTS, SCOPES)
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self._attributes = {}
+            self._classes = []
+            self._functions = []
+        elif isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name):
+                self._attributes.setdefault(node.attr, []).append(node)
+        elif isinstance(node, ast.ClassDef):
+            self._classes.append(node)
+        else:
+            self._functions.append(node)
+
+    def leave(self, node, checker):
+        if not isinstance(node, ast.Module):
+            return
+        for name, assign, grower in self._module_containers(node):
+            checker.report(
+                assign, "module-level container '{0}' is added to in "
+                "'{1}' but never shrunk", name, grower)
+        for name, assign, grower in self._class_containers():
+            checker.report(
+                assign, "class-level container '{0}' is added to in "
+                "'{1}' but never shrunk", name, grower)
+        for function in self._functions:
+            self._check_memoisation(function, checker)
+
+    def _growth(self, refs, value):
+        """Return the function adding to the container created by
+        `value` and referred to by `refs`, or `None` if nothing does
+        or something shrinks it.
+        """
+        sequence = _is_sequence(value)
+        grower = None
+        for ref in refs:
+            operation = _operation(ref, sequence)
+            if operation == SHRINK:
+                return None
+            if operation == GROW and grower is None:
+                grower = _function_of(ref)
+        return grower
+
+    def _module_containers(self, module):
+        reset = set(name for name, binding in module.scope.bindings
+                    if _function_of(binding.source) is not None)
+        for name, binding in module.scope.bindings:
+            if name in reset or not isinstance(binding, analyser.Assignment):
+                continue
+            assign = binding.source.parent
+            if not isinstance(assign, ast.Assign) or \
+                    not _is_container(assign.value):
+                continue
+            if _function_of(assign) is not None:
+                continue
+            grower = self._growth(
+                [use for scope, use in binding.uses], assign.value)
+            if grower is not None:
+                yield name, assign, grower.name
+
+    def _class_containers(self):
+        for cls in self._classes:
+            for stmt in cls.body:
+                if not isinstance(stmt, ast.Assign) or \
+                        len(stmt.targets) != 1 or \
+                        not isinstance(stmt.targets[0], ast.Name) or \
+                        not _is_container(stmt.value):
+                    continue
+                name = stmt.targets[0].id
+                refs = [ref for ref in self._attributes.get(name, ())
+                        if self._refers_to_class(ref, cls)]
+                if any(not isinstance(ref.ctx, ast.Load) for ref in refs):
+                    # assigned anew, or shadowed by an instance attribute.
+                    continue
+                grower = self._growth(refs, stmt.value)
+                if grower is not None:
+                    yield name, stmt, grower.name
+
+    def _refers_to_class(self, ref, cls):
+        """Return True if attribute `ref` is looked up on class `cls`
+        or, in its methods, on `self` or `cls`.
+        """
+        if ref.value.id == cls.name:
+            return True
+        if ref.value.id not in ('self', 'cls'):
+            return False
+        function = _function_of(ref)
+        return function is not None and function.parent is cls
+
+    def _is_unbounded(self, decorator, checker):
+        if isinstance(decorator, ast.Call):
+            name = ast_helpers.qualified_name(decorator.func, checker)
+            if name != 'functools.lru_cache':
+                return False
+            maxsize = decorator.args[0] if decorator.args else None
+            for keyword in decorator.keywords:
+                if keyword.arg == 'maxsize':
+                    maxsize = keyword.value
+            return _is_none(maxsize)
+        return ast_helpers.qualified_name(
+            decorator, checker) == 'functools.cache'
+
+    def _check_memoisation(self, function, checker):
+        for decorator in function.decorator_list:
+            if not self._is_unbounded(decorator, checker):
+                continue
+            if isinstance(function.parent, ast.ClassDef):
+                checker.report(
+                    decorator, "unbounded cache on method '{0}' keeps "
+                    "every instance it is called on alive", function.name)
+            else:
+                checker.report(
+                    decorator, "unbounded cache on '{0}'", function.name)
@@ -23,6 +23,7 @@ class ShortVariableRule(Rule):
     """
 
     types = (ast.FunctionDef,)
+    requires = ()
  
     defaults = {
         'threshold': 3
@@ -0,0 +1,292 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rules for code that is needlessly slow when run in a loop."""
+
+import ast
+
+from ..rule import Rule, PARENTS, SCOPES
+from .. import analyser
+from .. import ast_helpers
+from .. import pat
+
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+_RE_FUNCTIONS = ('compile', 'match', 'search', 'fullmatch', 'findall',
+                 'finditer', 'sub', 'subn', 'split')
+
+
+def _enclosing_loop(node):
+    """Return the innermost loop or comprehension that runs `node`
+    once per iteration, or `None`.
+
+    The iterable of a `for` loop and its `else` clause only run once.
+    Functions and classes defined in a loop are not considered to be
+    in it, since their bodies run when called.
+    """
+    child, parent = node, node.parent
+    while parent is not None:
+        if isinstance(parent, ast_helpers.FUNCTION_TYPES +
+                      (ast.Lambda, ast.ClassDef)):
+            return None
+        if isinstance(parent, ast_helpers.FOR_TYPES):
+            if child in parent.body or child is parent.target:
+                return parent
+        elif isinstance(parent, ast.While):
+            if child in parent.body or child is parent.test:
+                return parent
+        elif isinstance(parent, ast.comprehension):
+            if child is not parent.iter or parent is not \
+                    parent.parent.generators[0]:
+                return parent.parent
+        elif isinstance(parent, _COMPREHENSIONS):
+            if not isinstance(child, ast.comprehension):
+                return parent
+        child, parent = parent, parent.parent
+    return None
+
+
+def _inside(node, ancestor):
+    """Return True if `node` is below `ancestor` in the tree."""
+    while node is not None:
+        if node is ancestor:
+            return True
+        node = node.parent
+    return False
+
+
+def _assigned_value(checker, name):
+    """Return the value that the loaded name `name` was assigned by
+    a plain assignment, or `None`.
+    """
+    binding = checker.binding_for(name)
+    if not isinstance(binding, analyser.Assignment):
+        return None
+    statement = getattr(binding.source, 'parent', None)
+    if isinstance(statement, ast.Assign):
+        return statement.value
+    return None
+
+
+def _is_string(expr):
+    """Return True if `expr` evidently evaluates to a string."""
+    if isinstance(expr, ast.Str):
+        return True
+    if isinstance(expr, ast.BinOp):
+        if isinstance(expr.op, ast.Mod):
+            return isinstance(expr.left, ast.Str)
+        if isinstance(expr.op, ast.Add):
+            return _is_string(expr.left) or _is_string(expr.right)
+    if isinstance(expr, ast.Call):
+        func = expr.func
+        if isinstance(func, ast.Name):
+            return func.id in ('str', 'repr', 'unicode')
+        if isinstance(func, ast.Attribute):
+            return func.attr in ('format', 'join') and \
+                isinstance(func.value, ast.Str)
+    return False
+
+
+def _root(node):
+    while isinstance(node, ast.Attribute):
+        node = node.value
+    return node
+
+
+class StringConcatenationInLoopRule(Rule):
+    """Building a string with `+=` in a loop copies the string built
+    so far on every iteration, which is quadratic in its length.
+    Collect the parts in a list and `''.join()` them instead.
+
+    A concatenation is reported when either the added value or the
+    value the variable was assigned is evidently a string, unless the
+    variable is assigned anew in each iteration.
+    """
+
+    types = (ast.AugAssign,)
+    requires = (PARENTS, SCOPES)
+
+    def analyse(self, node, checker):
+        if not isinstance(node.op, ast.Add):
+            return
+        if not isinstance(node.target, ast.Name):
+            return
+        loop = _enclosing_loop(node)
+        if loop is None:
+            return
+        binding = checker.binding_for(node.target)
+        if binding is not None and _inside(binding.source, loop):
+            return
+        if _is_string(node.value) or _is_string(
+                _assigned_value(checker, node.target)):
+            checker.report(
+                node, "string '{0}' built with += in a loop, use "
+                "''.join() instead", node.target.id)
+
+
+class MembershipTestOnListInLoopRule(Rule):
+    """Testing membership with `in` on a list scans the whole list,
+    which adds up when done in a loop.  Use a set, built once outside
+    the loop, instead.
+    """
+
+    types = (ast.Compare,)
+    requires = (PARENTS, SCOPES)
+
+    def analyse(self, node, checker):
+        if not any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops):
+            return
+        if _enclosing_loop(node) is None:
+            return
+        for op, comparator in zip(node.ops, node.comparators):
+            if not isinstance(op, (ast.In, ast.NotIn)):
+                continue
+            if isinstance(comparator, ast.List):
+                checker.report(
+                    node, "membership test on a list literal in a loop, "
+                    "use a set instead")
+            elif isinstance(comparator, ast.Name) and isinstance(
+                    _assigned_value(checker, comparator),
+                    (ast.List, ast.ListComp)):
+                checker.report(
+                    node, "membership test on list '{0}' in a loop, "
+                    "use a set instead", comparator.id)
+
+
+class RegexInLoopRule(Rule):
+    """Functions of the `re` module compile (or look up in a small
+    cache) their pattern on every call.  Compile a constant pattern
+    once, outside of the loop, and use the compiled expression.
+    """
+
+    types = (ast.Call,)
+    requires = (PARENTS, SCOPES)
+
+    def analyse(self, node, checker):
+        if not node.args or not isinstance(node.args[0], ast.Str):
+            return
+        name = ast_helpers.qualified_name(node.func, checker)
+        if name is None or not name.startswith('re.'):
+            return
+        function = name[len('re.'):]
+        if function not in _RE_FUNCTIONS:
+            return
+        if _enclosing_loop(node) is not None:
+            checker.report(
+                node, "constant regular expression used with re.{0}() in "
+                "a loop, compile it once outside the loop", function)
+
+
+class LoopInvariantLookupRule(Rule):
+    """Every `a.b.c` in a loop looks up each attribute again on every
+    iteration, as does a module attribute like `math.sqrt`.  In tight
+    loops, bind the result to a local name before the loop.
+
+    Only innermost loops are checked, and only lookups whose parts
+    are not assigned to in the loop.
+    """
+
+    types = (ast.Module, ast.Name, ast.Attribute, ast.For, ast.While)
+    requires = (PARENTS, SCOPES)
+
+    defaults = {
+        'enabled': False
+        }
+
+    def _body(self, node):
+        if isinstance(node, ast_helpers.FOR_TYPES):
+            return node.body
+        return [node.test] + node.body
+
+    def _is_module_attribute(self, chain, checker):
+        binding = checker.binding_for(_root(chain))
+        return isinstance(binding, analyser.Importation)
+
+    def enter(self, node, checker):
+        if isinstance(node, ast.Module):
+            self._loops = []
+            self._names = {}
+            self._outer = set()
+        elif isinstance(node, ast_helpers.LOOP_TYPES):
+            self._loops.append(node)
+            self._names[node] = []
+            # loops with this one in their body are not innermost.
+            child, parent = node, node.parent
+            while parent is not None:
+                if isinstance(parent, ast_helpers.LOOP_TYPES) and \
+                        child in self._body(parent):
+                    self._outer.add(parent)
+                child, parent = parent, parent.parent
+        else:
+            loop = _enclosing_loop(node)
+            if loop in self._names:
+                self._names[loop].append(node)
+
+    def leave(self, node, checker):
+        if isinstance(node, ast.Module):
+            for loop in self._loops:
+                if loop not in self._outer:
+                    self._check(loop, self._names[loop], checker)
+
+    def _check(self, node, names, checker):
+        """Report the lookups among the `names` that loop `node` runs
+        on every iteration.
+        """
+        stored = set()
+        if isinstance(node, ast_helpers.FOR_TYPES):
+            stored.update(child.id for child in ast.walk(node.target)
+                          if isinstance(child, ast.Name))
+        for child in names:
+            if not isinstance(child.ctx, ast.Load):
+                stored.add(ast_helpers.dotted_name(child))
+
+        reported = set()
+        for child in names:
+            if not isinstance(child, ast.Attribute) or \
+                    not isinstance(child.ctx, ast.Load):
+                continue
+            if isinstance(child.parent, ast.Attribute):
+                continue
+            name = ast_helpers.dotted_name(child)
+            if name is None or name in reported:
+                continue
+            parts = name.split('.')
+            if any('.'.join(parts[:i]) in stored
+                   for i in range(1, len(parts) + 1)):
+                continue
+            if len(parts) > 2 or self._is_module_attribute(child, checker):
+                reported.add(name)
+                checker.report(
+                    child, "loop-invariant lookup '{0}' in a loop, bind "
+                    "it to a local name before the loop", name)
+
+
+class IterateDictDirectlyRule(Rule):
+    """Iterating over `d.keys()` builds a list of the keys first (or
+    a view in Python 3) only to iterate over it; iterate over the dict
+    itself instead.
+    """
+
+    types = (ast.For, ast.comprehension)
+    requires = ()
+
+    def _init_config(self, config):
+        self.keys_pat = pat.parse('_.keys()')
+
+    def analyse(self, node, checker):
+        if pat.match(node.iter, self.keys_pat):
+            checker.report(
+                node.iter, "iterate over the dict rather than over "
+                "'{0}()'", ast_helpers.dotted_name(node.iter.func) or 'keys')
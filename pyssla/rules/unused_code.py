@@ -0,0 +1,158 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import ast
+import os
+
+from ..rule import Rule, PARENTS, SCOPES
+from .. import analyser
+from .. import pat
+
+
+def _used_names(scope):
+    """Return the names in `scope` for which any binding is used."""
+    return set(name for name, binding in scope.bindings if binding.uses)
+
+
+def _unused(scope, kind):
+    """Yield `(name, binding)` for the first binding of type `kind`
+    of each name in `scope` that is never used.
+    """
+    used = _used_names(scope)
+    seen = set()
+    for name, binding in scope.bindings:
+        if name in used or name in seen or not isinstance(binding, kind):
+            continue
+        seen.add(name)
+        yield name, binding
+
+
+def _exported_names(module):
+    """Return the names listed in a module-level `__all__`."""
+    names = set()
+    for stmt in module.body:
+        if not isinstance(stmt, (ast.Assign, ast.AugAssign)):
+            continue
+        targets = getattr(stmt, 'targets', None) or [stmt.target]
+        if not any(isinstance(target, ast.Name) and target.id == '__all__'
+                   for target in targets):
+            continue
+        if isinstance(stmt.value, (ast.List, ast.Tuple)):
+            for elt in stmt.value.elts:
+                if isinstance(elt, ast.Str):
+                    names.add(elt.s)
+    return names
+
+
+_LOCALS_PAT = pat.parse('locals()')
+
+
+class UnusedImportRule(Rule):
+    """Imported names that are never used make it harder to see what
+    a module depends on, and slow down importing it.
+
+    Names listed in `__all__` count as used, and imports in
+    `__init__.py` files are not reported since they usually define
+    the package interface.
+    """
+
+    types = (ast.Module, ast.FunctionDef)
+    requires = (SCOPES,)
+
+    def analyse(self, node, checker):
+        exported = set()
+        if isinstance(node, ast.Module):
+            if os.path.basename(checker.filename) == '__init__.py':
+                return
+            exported = _exported_names(node)
+        for name, binding in _unused(node.scope, analyser.Importation):
+            if name in exported or binding.name == '__future__':
+                continue
+            checker.report(
+                binding.source, "'{0}' imported but unused", name)
+
+
+class UnusedVariableRule(Rule):
+    """A local variable that is assigned to but never read is either
+    dead code or a sign of a typo elsewhere in the function.
+
+    Names starting with an underscore, and functions that use
+    `locals()`, are not reported.
+    """
+
+    types = (ast.FunctionDef,)
+    requires = (PARENTS, SCOPES)
+
+    def analyse(self, node, checker):
+        unused = [(name, binding)
+                  for name, binding in _unused(node.scope, analyser.Assignment)
+                  if not name.startswith('_') and
+                  isinstance(binding.source.parent, ast.Assign)]
+        if unused and pat.scan(node, _LOCALS_PAT):
+            return
+        for name, binding in unused:
+            checker.report(
+                binding.source,
+                "local variable '{0}' is assigned to but never used", name)
+
+
+def _is_stub(node):
+    """Return True if function `node` has no real body, e.g. an
+    abstract or default implementation.
+    """
+    for stmt in node.body:
+        if isinstance(stmt, ast.Pass):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Str):
+            continue
+        if isinstance(stmt, ast.Raise):
+            continue
+        if isinstance(stmt, ast.Return) and (
+                stmt.value is None or
+                isinstance(stmt.value, ast.Name) and stmt.value.id == 'None'):
+            continue
+        return False
+    return True
+
+
+class UnusedArgumentRule(Rule):
+    """Arguments that are never used complicate the interface of a
+    function for no benefit.
+
+    The first argument of methods, names starting with an underscore
+    and functions that only consist of `pass`, a docstring, `raise`
+    or `return None` are not reported.
+    """
+
+    types = (ast.FunctionDef,)
+    requires = (PARENTS, SCOPES)
+
+    defaults = {
+        "enabled": False
+        }
+
+    def analyse(self, node, checker):
+        if _is_stub(node):
+            return
+        ignored = set()
+        positional = getattr(node.args, 'posonlyargs', []) + node.args.args
+        if isinstance(node.parent, ast.ClassDef) and positional:
+            # an `ast.arg` in Python 3.
+            first = positional[0]
+            ignored.add(getattr(first, 'arg', getattr(first, 'id', None)))
+        for name, binding in _unused(node.scope, analyser.Argument):
+            if name in ignored or name.startswith('_'):
+                continue
+            checker.report(node, "unused argument '{0}'", name)
@@ -0,0 +1,118 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Loading and configuration of rules."""
+
+from collections import defaultdict
+
+from stevedore import extension
+
+from .checker import Checker, ProjectChecker, StatisticsChecker
+from .rule import PROJECT
+
+NAMESPACE = 'pyssla.rules'
+
+
+def load_config(filename):
+    """Load a YAML config file mapping rule names to rule options."""
+    import yaml
+
+    with open(filename) as filep:
+        config = yaml.safe_load(filep)
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise ValueError("{0}: config must be a mapping of rule names".format(
+            filename))
+    return config
+
+
+class RuleSet(object):
+    """A set of configured rule instances.
+
+    Rules are instantiated once and then reused for every file that
+    is checked, so configuring a rule (which may include compiling
+    patterns) is only paid for once per run.
+
+    :ivar statistics: Only count violations, see `StatisticsChecker`.
+    :ivar dedup: Report each binding at most once per rule.
+    """
+
+    def __init__(self, rules, statistics=False, dedup=False):
+        self.rules = list(rules)
+        self.statistics = statistics
+        self.dedup = dedup
+
+    @classmethod
+    def load(cls, config=None, disable=(), statistics=False, dedup=False):
+        """Load all rules registered as `pyssla.rules` entry points,
+        except the ones in `disable` or disabled by `config`.
+        """
+        config = config or {}
+        mgr = extension.ExtensionManager(
+            namespace=NAMESPACE,
+            invoke_on_load=False
+            )
+        rules = []
+        for ext in mgr:
+            if ext.name in disable:
+                continue
+            rule = cls.create(ext.name, ext.plugin, config.get(ext.name))
+            if rule is not None:
+                rules.append(rule)
+        return cls(rules, statistics, dedup)
+
+    @staticmethod
+    def create(name, plugin, options=None):
+        """Instantiate rule class `plugin` registered as `name`.
+
+        Returns `None` if the rule is disabled.
+        """
+        rule_conf = dict(getattr(plugin, 'defaults', {}))
+        rule_conf.update(options or {})
+        if not rule_conf.get('enabled', True):
+            return None
+        rule = plugin(rule_conf)
+        rule.name = name
+        return rule
+
+    def checker(self, filename):
+        """Return a `Checker` for `filename` with all rules added."""
+        if self.statistics:
+            checker = StatisticsChecker(filename, self.dedup)
+        else:
+            checker = Checker(filename, self.dedup)
+        for rule in self.rules:
+            checker.add_rule(rule)
+        return checker
+
+    def finish(self, file_records):
+        """Run the project-wide part of the rules.
+
+        `file_records` maps file names to the records made while
+        checking them, as in `Checker.records`.  Returns the reported
+        messages.
+        """
+        records = defaultdict(list)
+        for filename, by_rule in file_records.items():
+            for name, values in by_rule.items():
+                records[name].extend((filename, value) for value in values)
+        checker = ProjectChecker()
+        for rule in self.rules:
+            if PROJECT not in rule.requires:
+                continue
+            checker.rule = rule
+            rule.finish(records.get(rule.name, []), checker)
+        return checker.messages
@@ -0,0 +1,225 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Checking of individual files, with per-file budgets."""
+
+import ast
+import contextlib
+import copy
+import multiprocessing
+import signal
+import threading
+import time
+
+from . import api
+from . import hotness
+from . import schedule
+from . import sources
+
+
+class FileTimeout(BaseException):
+    """Raised when a file exceeds its time budget.
+
+    This is a `BaseException` so that it is not swallowed by the
+    `except Exception` clauses that rules and helpers use.
+    """
+
+
+class FileResult(object):
+    """Outcome of checking a single file.
+
+    :ivar counts: Violations per rule name, for statistics runs.
+    :ivar records: Values recorded for project-wide rules, per rule
+        name.
+    :ivar error: A diagnostic if the file was skipped or aborted,
+        otherwise `None`.
+    """
+
+    def __init__(self, filename, messages=(), duration=0.0, error=None,
+                 counts=None, records=None):
+        self.filename = filename
+        self.messages = list(messages)
+        self.duration = duration
+        self.error = error
+        self.counts = dict(counts or {})
+        self.records = dict(records or {})
+
+    def renamed(self, filename):
+        """Return a copy of the result for another file with the same
+        contents, which took no time to check.
+        """
+        messages = []
+        for message in self.messages:
+            message = copy.copy(message)
+            message.filename = filename
+            messages.append(message)
+        return FileResult(filename, messages, 0.0, self.error, self.counts,
+                          self.records)
+
+
+def _alarm(signum, frame):
+    raise FileTimeout()
+
+
+@contextlib.contextmanager
+def _deadline(timeout):
+    """Raise `FileTimeout` in the block if it runs for longer than
+    `timeout` seconds.
+
+    Deadlines rely on `SIGALRM` and are silently not enforced where
+    that is unavailable, or outside of the main thread.
+    """
+    if (not timeout or not hasattr(signal, 'setitimer') or
+            threading.current_thread().name != 'MainThread'):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _as_source(source):
+    if isinstance(source, sources.Source):
+        return source
+    return sources.FileSource(source)
+
+
+def _too_deep(source, start):
+    return FileResult(
+        source.name, duration=time.time() - start,
+        error="aborted: code is nested too deeply to analyse")
+
+
+def check_file(rules, source, max_size=None, timeout=None, cache=None,
+               profile=None):
+    """Check `source`, a `pyssla.sources.Source` or a file name, with
+    `rules`.
+
+    Sources larger than `max_size` bytes are skipped without being
+    read, and analysis is aborted after `timeout` seconds.  Sources
+    that cannot be parsed, or are nested too deeply to analyse, get an
+    error rather than ending the run; errors raised by rules are not
+    caught.  Rule results are reused from `cache` if given.  If a
+    `pyssla.hotness.Profile` is given, messages are annotated with the
+    time spent in their functions.
+    """
+    source = _as_source(source)
+    start = time.time()
+    if max_size is not None and source.size > max_size:
+        return FileResult(
+            source.name, error="skipped: {0} bytes exceeds the limit of "
+            "{1} bytes".format(source.size, max_size))
+    text = source.read()
+    try:
+        tree = ast.parse(text, source.name)
+    except (SyntaxError, TypeError, ValueError) as exc:
+        # the parser raises the latter two for null bytes.
+        return FileResult(
+            source.name, duration=time.time() - start,
+            error="skipped: cannot parse: {0}".format(exc))
+    except (RuntimeError, MemoryError):
+        # `RecursionError`, or a parser stack overflow, on deeply
+        # nested code.
+        return _too_deep(source, start)
+    try:
+        with _deadline(timeout):
+            checker = api.analyse_source(
+                text, source.name, rules, cache, tree)
+            if profile is not None:
+                hotness.annotate(checker.messages, checker.tree,
+                                 profile.lookup(source.name))
+    except FileTimeout:
+        return FileResult(
+            source.name, duration=time.time() - start,
+            error="aborted: analysis exceeded the limit of {0} "
+            "seconds".format(timeout))
+    except RuntimeError as exc:
+        # errors in rules are not the fault of the checked code, and
+        # are left to propagate.
+        if 'recursion' not in str(exc):
+            raise
+        return _too_deep(source, start)
+    return FileResult(source.name, checker.messages, time.time() - start,
+                      counts=getattr(checker, 'counts', None),
+                      records=checker.records)
+
+
+_worker_args = None
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _work(source):
+    rules, max_size, timeout, cache, profile = _worker_args
+    return check_file(rules, source, max_size, timeout, cache, profile)
+
+
+def check_files(rules, sources, jobs=1, max_size=None, timeout=None,
+                cache=None, durations=None, profile=None):
+    """Check all of `sources`, given as sources or file names,
+    returning their `FileResult`s in the same order.
+
+    Sources with the same `key` are only checked once, the others get
+    a renamed copy of its result.
+
+    With more than one job the sources are checked in a pool of
+    worker processes.  They are handed out one at a time, most
+    expensive first according to `durations` (see
+    `schedule.longest_first`), so that a worker that finishes early
+    picks up the next one.
+    """
+    sources = [_as_source(source) for source in sources]
+    by_key = {}
+    for source in sources:
+        by_key.setdefault(source.key, source)
+    by_name = dict((source.name, source) for source in by_key.values())
+
+    if jobs <= 1:
+        results = dict((source.name, check_file(
+                    rules, source, max_size, timeout, cache, profile))
+                       for source in sources if source.name in by_name)
+    else:
+        ordered = schedule.longest_first(
+            list(by_name), durations or {},
+            lambda name: by_name[name].size)
+        pool = multiprocessing.Pool(
+            jobs, _init_worker, (rules, max_size, timeout, cache, profile))
+        try:
+            results = dict((result.filename, result)
+                           for result in pool.imap_unordered(
+                               _work, [by_name[name] for name in ordered]))
+        finally:
+            pool.close()
+            pool.join()
+
+    file_results = []
+    for source in sources:
+        result = results[by_key[source.key].name]
+        if result.filename != source.name:
+            result = result.renamed(source.name)
+        file_results.append(result)
+    return file_results
+
+
+def slowest(file_results, count):
+    """Return the `count` slowest of `file_results`."""
+    return sorted(file_results, key=lambda result: -result.duration)[:count]
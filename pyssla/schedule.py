@@ -0,0 +1,80 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Ordering of work by its expected cost.
+
+With several workers, a long file that is started last keeps one
+worker busy while the others are idle.  Starting with the most
+expensive files avoids that long tail.  The cost of a file is the time
+it took to analyse in a previous run, or, for files that have not been
+seen before, an estimate based on its size.
+"""
+
+import json
+import os
+import tempfile
+
+DURATIONS_FILE = 'durations.json'
+
+
+def load_durations(directory):
+    """Load the per-file durations stored in `directory`."""
+    try:
+        with open(os.path.join(directory, DURATIONS_FILE)) as filep:
+            return json.load(filep)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_durations(directory, durations):
+    """Store per-file `durations` in `directory`."""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmppath = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as filep:
+        json.dump(durations, filep, sort_keys=True)
+    os.rename(tmppath, os.path.join(directory, DURATIONS_FILE))
+
+
+def longest_first(filenames, durations, size=os.path.getsize):
+    """Order `filenames` by expected analysis time, longest first.
+
+    Files without a recorded duration are estimated from their size,
+    using the average time per byte of the files that have one.
+    """
+    sizes = dict((filename, size(filename)) for filename in filenames)
+    known = [filename for filename in filenames if filename in durations]
+    known_bytes = sum(sizes[filename] for filename in known)
+    if known_bytes:
+        per_byte = sum(durations[filename] for filename in known) / known_bytes
+    else:
+        per_byte = 1.0
+
+    def cost(filename):
+        if filename in durations:
+            return durations[filename]
+        return sizes[filename] * per_byte
+
+    return sorted(filenames, key=lambda filename: (-cost(filename), filename))
+
+
+def efficiency(file_results, wall_time, workers):
+    """Return the fraction of the available worker time that was
+    spent analysing files.
+    """
+    if not wall_time or not workers:
+        return 0.0
+    busy = sum(result.duration for result in file_results)
+    return busy / (wall_time * workers)
@@ -12,46 +12,221 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import ast
+from __future__ import print_function
+
 import argparse
+import subprocess
 import sys
+import time
+
+from .rulecache import RuleCache
+from .checker import Message
+from . import git
+from . import hotness
+from . import results
+from . import runner
+from . import schedule
+from . import store
+from . import shard
+from . import sources
+from .ruleset import RuleSet, load_config
+
+
+def _warn(message):
+    print('pyssla: {0}'.format(message), file=sys.stderr)
+
+
+def _report(messages):
+    for message in messages:
+        print(message)
+    if messages:
+        sys.exit(1)
+
+
+def _report_statistics(file_results, project_messages):
+    counts = {}
+    for result in file_results:
+        for rule, count in result.counts.items():
+            counts[result.filename, rule] = count
+    for message in project_messages:
+        key = (message.filename, message.rule)
+        counts[key] = counts.get(key, 0) + 1
+    totals = {}
+    for (filename, rule), count in sorted(counts.items()):
+        print('{0}: {1}: {2}'.format(filename, rule, count))
+        totals[rule] = totals.get(rule, 0) + count
+    for rule, count in sorted(totals.items()):
+        print('total: {0}: {1}'.format(rule, count))
+    if totals:
+        sys.exit(1)
+
+
+def merge_main(argv):
+    parser = argparse.ArgumentParser(
+        prog='pyssla merge',
+        description='combine the result files of sharded runs'
+    )
+    parser.add_argument(
+        'results',
+        nargs='+',
+        help='result files written with --results'
+    )
+    parser.add_argument(
+        '-d', '--disable',
+        nargs='*',
+        default=[],
+        type=str,
+        help='project-wide rules to disable',
+    )
+    parser.add_argument(
+        '-c', '--config',
+        type=str,
+        help='pyssla config file'
+        )
+    _add_store_arguments(parser)
+    parsed_args = parser.parse_args(argv)
+
+    documents = [results.load(filename) for filename in parsed_args.results]
+    for problem in results.check_shards(documents):
+        _warn('warning: {0}'.format(problem))
+    for document in documents:
+        for filename, error in sorted(document['errors'].items()):
+            _warn('{0}: {1}'.format(filename, error))
+
+    config = {}
+    if parsed_args.config:
+        config = load_config(parsed_args.config)
+    rules = RuleSet.load(config, parsed_args.disable)
+
+    messages = results.merge(documents, rules)
+    if parsed_args.store:
+        _save_run(parsed_args.store, messages, parsed_args.revision)
+    _report(messages)
+
 
-from stevedore import extension
+def _save_run(path, messages, revision):
+    database = store.Store(path)
+    try:
+        run = database.add_run(messages, revision or store.current_revision())
+    finally:
+        database.close()
+    _warn('stored {0} violations as run {1} in {2}'.format(
+        len(messages), run, path))
 
-from .analyser import ScopeAnalyser
-from .checker import Checker
-from . import ast_helpers
 
+def _add_store_arguments(parser):
+    parser.add_argument(
+        '--store',
+        type=str,
+        metavar='DATABASE',
+        help='also store the violations in this SQLite database'
+        )
+    parser.add_argument(
+        '--revision',
+        type=str,
+        help='revision to record with --store, defaults to the git HEAD'
+        )
 
-def process(config, filename, exts):
-    with open(filename) as filep:
-        tree = ast.parse(filep.read(), filename)
 
-    ast_helpers.set_parent(tree)
+def query_main(argv):
+    parser = argparse.ArgumentParser(
+        prog='pyssla query',
+        description='query a database written with --store'
+    )
+    parser.add_argument(
+        'database',
+        help='the SQLite database'
+    )
+    subparsers = parser.add_subparsers(dest='query')
+    # Python 3 makes subcommands optional by default.
+    subparsers.required = True
+    subparsers.add_parser('runs', help='list the stored runs')
+    top_parser = subparsers.add_parser(
+        'top', help='rules or files with the most violations')
+    top_parser.add_argument(
+        '--run',
+        type=int,
+        help='run to look at, defaults to the latest'
+        )
+    top_parser.add_argument(
+        '--by',
+        choices=('rule', 'file'),
+        default='rule',
+        help='group violations by rule or by file'
+        )
+    top_parser.add_argument(
+        '--limit',
+        type=int,
+        default=20
+        )
+    diff_parser = subparsers.add_parser(
+        'diff', help='changes in violations between two runs')
+    diff_parser.add_argument(
+        'runs',
+        type=int,
+        nargs='*',
+        help='old and new run, defaults to the last two'
+        )
+    for subparser in (top_parser, diff_parser):
+        subparser.add_argument(
+            '--path',
+            type=str,
+            help='only consider files below this path'
+            )
+    parsed_args = parser.parse_args(argv)
 
-    analyser = ScopeAnalyser()
-    analyser.analyse(tree)
+    database = store.Store(parsed_args.database)
+    try:
+        if parsed_args.query == 'runs':
+            for run, started, revision, count in database.runs():
+                print('{0}: {1} {2} {3} violations'.format(
+                    run, time.strftime('%Y-%m-%d %H:%M:%S',
+                                       time.localtime(started)),
+                    revision or '-', count))
+        elif parsed_args.query == 'top':
+            run = parsed_args.run
+            if run is None:
+                run = (database.last_runs(1) or [None])[0]
+            by = 'filename' if parsed_args.by == 'file' else 'rule'
+            for key, count, value in database.top(
+                    run, by, parsed_args.path, parsed_args.limit):
+                if value is None:
+                    print('{0:6d} {1}'.format(count, key))
+                else:
+                    print('{0:6d} {1} (max {2:g})'.format(count, key, value))
+        else:
+            runs = parsed_args.runs or database.last_runs(2)
+            if len(runs) != 2:
+                parser.error('diff needs two runs')
+            for rule, filename, before, after in database.diff(
+                    runs[0], runs[1], parsed_args.path):
+                print('{0:+6d} {1}: {2} ({3} -> {4})'.format(
+                    after - before, filename, rule, before, after))
+    finally:
+        database.close()
 
-    checker = Checker(filename)
-    for ext in exts:
-        rule_conf = getattr(ext.plugin, 'defaults', {})
-        rule_conf.update(config.get(ext.name, {}))
-        enabled = rule_conf.get('enabled', True)
-        if enabled:
-            checker.add_rule(ext.plugin(rule_conf))
 
-    checker.analyse(tree)
+_COMMANDS = {
+    'merge': merge_main,
+    'query': query_main,
+    }
 
-    return checker.messages
 
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in _COMMANDS:
+        return _COMMANDS[argv[0]](argv[1:])
 
-def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         'files',
-        nargs='+',
-        default='simple',
-        help='the files to analyse'
+        nargs='*',
+        default=[],
+        help='the files to analyse; wheels, zip files and .tar.gz '
+        'archives are searched for modules.  With --rev, only the '
+        'modules below these paths, relative to the top of the '
+        'repository, are analysed'
     )
     parser.add_argument(
         '-d', '--disable',
@@ -67,24 +242,200 @@ def main():
         help='pyssla config file'
         )
 
-    parsed_args = parser.parse_args()
+    parser.add_argument(
+        '--rev',
+        action='append',
+        default=[],
+        metavar='REV',
+        help='analyse the modules in this revision of the git repository '
+        'in the current directory, or in each commit of a range A..B'
+        )
+
+    parser.add_argument(
+        '--shard',
+        type=str,
+        help='only analyse shard I of N, given as I/N'
+        )
 
-    config = {}
+    parser.add_argument(
+        '--results',
+        type=str,
+        help='write structured results to this file'
+        )
+
+    parser.add_argument(
+        '--max-file-size',
+        type=int,
+        metavar='BYTES',
+        help='skip files larger than this'
+        )
+
+    parser.add_argument(
+        '--file-timeout',
+        type=float,
+        metavar='SECONDS',
+        help='abort the analysis of a file after this many seconds'
+        )
+
+    parser.add_argument(
+        '--slowest',
+        type=int,
+        metavar='N',
+        default=0,
+        help='list the N slowest files when done'
+        )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='number of worker processes'
+        )
+
+    parser.add_argument(
+        '--timing',
+        action='store_true',
+        help='report run time and parallel efficiency'
+        )
+
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        metavar='DIR',
+        help='cache rule results and durations in this directory'
+        )
 
-    mgr = extension.ExtensionManager(
-        namespace='pyssla.rules',
-        invoke_on_load=False
+    parser.add_argument(
+        '--statistics',
+        action='store_true',
+        help='only count violations per rule and file'
         )
-    exts = [ext for ext in mgr
-            if ext.name not in parsed_args.disable]
+
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='report repeated violations for the same name only once'
+        )
+
+    parser.add_argument(
+        '--profile-data',
+        type=str,
+        metavar='FILE',
+        help='rank violations by the time spent in their functions, '
+        'according to this cProfile or profile dump'
+        )
+
+    _add_store_arguments(parser)
+
+    parsed_args = parser.parse_args(argv)
+
+    if not parsed_args.files and not parsed_args.rev:
+        parser.error('no files or revisions to analyse')
+    if parsed_args.statistics and parsed_args.results:
+        parser.error('--statistics cannot be combined with --results')
+    if parsed_args.statistics and parsed_args.store:
+        parser.error('--statistics cannot be combined with --store')
+    if parsed_args.results and parsed_args.store:
+        # results files lack the project-wide violations until merged.
+        parser.error('--results cannot be combined with --store, '
+                     'use --store with pyssla merge')
+    if parsed_args.statistics and parsed_args.profile_data:
+        parser.error('--statistics cannot be combined with --profile-data')
+
+    profile = None
+    if parsed_args.profile_data:
+        try:
+            profile = hotness.load_profile(parsed_args.profile_data)
+        except (IOError, EOFError, TypeError, ValueError) as exc:
+            parser.error('cannot read profile data: {0}'.format(exc))
+
+    shard_spec = None
+    if parsed_args.shard:
+        try:
+            shard_spec = shard.parse_shard(parsed_args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if parsed_args.rev:
+        try:
+            modules = list(git.expand(parsed_args.rev, parsed_args.files))
+        except (git.GitError, subprocess.CalledProcessError) as exc:
+            parser.error(str(exc))
+        if not modules:
+            parser.error('no modules in the given revisions and paths')
+    else:
+        try:
+            modules = list(sources.expand(parsed_args.files))
+        except sources.SourceError as exc:
+            parser.error(str(exc))
+    if shard_spec:
+        by_name = dict((source.name, source) for source in modules)
+        modules = [by_name[name] for name in shard.select(
+            list(by_name), shard_spec[0], shard_spec[1],
+            lambda name: by_name[name].size)]
+
+    config = {}
+    if parsed_args.config:
+        config = load_config(parsed_args.config)
+
+    rules = RuleSet.load(config, parsed_args.disable,
+                         parsed_args.statistics, parsed_args.dedup)
+
+    cache = None
+    if parsed_args.cache_dir:
+        cache = RuleCache(parsed_args.cache_dir)
+
+    durations = {}
+    if parsed_args.cache_dir:
+        durations = schedule.load_durations(parsed_args.cache_dir)
+
+    start = time.time()
+    file_results = runner.check_files(
+        rules, modules, parsed_args.jobs, parsed_args.max_file_size,
+        parsed_args.file_timeout, cache, durations, profile)
+    wall_time = time.time() - start
 
     messages = []
+    for result in file_results:
+        if result.error:
+            _warn('{0}: {1}'.format(result.filename, result.error))
+        else:
+            durations[result.filename] = result.duration
+        messages.extend(result.messages)
 
-    for filename in parsed_args.files:
-        messages.extend(process(config, filename, exts))
+    if parsed_args.cache_dir:
+        schedule.save_durations(parsed_args.cache_dir, durations)
 
-    if messages:
-        for message in messages:
-            print message
+    if parsed_args.timing:
+        jobs = max(parsed_args.jobs, 1)
+        _warn('analysed {0} files in {1:.3f}s with {2} workers, '
+              'parallel efficiency {3:.0%}'.format(
+                  len(file_results), wall_time, jobs,
+                  schedule.efficiency(file_results, wall_time, jobs)))
 
-        sys.exit(1)
+    if parsed_args.slowest:
+        _warn('slowest files:')
+        for result in runner.slowest(file_results, parsed_args.slowest):
+            _warn('  {0:8.3f}s {1}'.format(result.duration, result.filename))
+
+    if parsed_args.results:
+        results.dump(parsed_args.results, file_results, shard_spec)
+        return
+
+    file_records = dict((result.filename, result.records)
+                        for result in file_results)
+    if parsed_args.rev:
+        project_messages = []
+        for revision in git.by_revision(file_records):
+            project_messages.extend(rules.finish(revision))
+    else:
+        project_messages = rules.finish(file_records)
+    if parsed_args.statistics:
+        _report_statistics(file_results, project_messages)
+    else:
+        messages.extend(sorted(project_messages, key=Message.sort_key))
+        if profile is not None:
+            messages = hotness.rank(messages)
+        if parsed_args.store:
+            _save_run(parsed_args.store, messages, parsed_args.revision)
+        _report(messages)
@@ -0,0 +1,59 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Deterministic partitioning of the input files across CI shards."""
+
+import heapq
+import os
+
+
+def parse_shard(spec):
+    """Parse a shard specification of the form `I/N`.
+
+    Shards are numbered from 1 to N.  Raises `ValueError` if the
+    specification is malformed.
+    """
+    try:
+        index, count = [int(part) for part in spec.split('/')]
+    except ValueError:
+        raise ValueError("shard must be given as I/N: {0!r}".format(spec))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError("shard index out of range: {0!r}".format(spec))
+    return index, count
+
+
+def partition(filenames, count, size=os.path.getsize):
+    """Split `filenames` into `count` shards of roughly equal total
+    size.
+
+    Files are placed largest first onto the currently lightest shard.
+    Ties are broken by file name and shard number, so every node that
+    computes the partition for the same input gets the same result.
+    """
+    sized = sorted(set(filenames), key=lambda name: (-size(name), name))
+    heap = [(0, index) for index in range(count)]
+    shards = [[] for index in range(count)]
+    for filename in sized:
+        load, index = heapq.heappop(heap)
+        shards[index].append(filename)
+        heapq.heappush(heap, (load + size(filename), index))
+    return [sorted(shard) for shard in shards]
+
+
+def select(filenames, index, count, size=os.path.getsize):
+    """Return the files belonging to shard `index` (1-based) of
+    `count`.
+    """
+    return partition(filenames, count, size)[index - 1]
@@ -0,0 +1,214 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Sources of modules to analyse: plain files and archive members."""
+
+import atexit
+import mmap
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+ZIP_SUFFIXES = ('.whl', '.zip')
+TAR_SUFFIXES = ('.tar.gz', '.tgz')
+
+# separates the archive from the member in the name of a source.
+MEMBER_SEPARATOR = '!'
+
+
+class SourceError(Exception):
+    """Raised when a path given to `expand` cannot be read."""
+
+
+class Source(object):
+    """A module to analyse.
+
+    :ivar name: The name used when reporting violations.
+    :ivar size: The size of the module source in bytes.
+    :ivar key: Identifies the module contents; sources with the same
+        key are only analysed once.
+    """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.key = name
+
+    def read(self):
+        """Return the source text of the module."""
+        raise NotImplementedError()
+
+
+class FileSource(Source):
+    """A module in a file."""
+
+    def __init__(self, path):
+        Source.__init__(self, path, os.path.getsize(path))
+
+    def read(self):
+        with open(self.name) as filep:
+            return filep.read()
+
+
+class MemorySource(Source):
+    """A module whose source has already been read."""
+
+    def __init__(self, name, data):
+        Source.__init__(self, name, len(data))
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class _MappedFile(object):
+    """File-like view of a memory mapping, for `zipfile`.
+
+    Needed since `mmap.read` requires a size in Python 2.
+    """
+
+    def __init__(self, mapped):
+        self._mapped = mapped
+
+    def read(self, size=-1):
+        if size < 0:
+            size = len(self._mapped) - self._mapped.tell()
+        return self._mapped.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._mapped.seek(offset, whence)
+
+    def tell(self):
+        return self._mapped.tell()
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self._mapped.close()
+
+
+# zip archives opened in this process, so that the archive is mapped
+# and its directory read once rather than once per member.
+_zip_files = {}
+
+
+def _open_zip(path):
+    if path not in _zip_files:
+        try:
+            with open(path, 'rb') as filep:
+                mapped = mmap.mmap(
+                    filep.fileno(), 0, access=mmap.ACCESS_READ)
+            _zip_files[path] = zipfile.ZipFile(_MappedFile(mapped))
+        except (IOError, OSError, ValueError, zipfile.BadZipfile) as exc:
+            # an empty file cannot be mapped, and a corrupt archive
+            # gives errors while seeking in it.
+            raise SourceError(
+                '{0}: cannot read archive: {1}'.format(path, exc))
+    return _zip_files[path]
+
+
+class ZipMemberSource(Source):
+    """A module in a zip archive or wheel.
+
+    The member is only decompressed when it is read, from a memory
+    mapping of the archive.
+    """
+
+    def __init__(self, path, member, size):
+        Source.__init__(
+            self, path + MEMBER_SEPARATOR + member, size)
+        self.path = path
+        self.member = member
+
+    def read(self):
+        return _open_zip(self.path).read(self.member)
+
+
+def _zip_sources(path):
+    for info in _open_zip(path).infolist():
+        if info.filename.endswith('.py'):
+            yield ZipMemberSource(path, info.filename, info.file_size)
+
+
+class TarMemberSource(Source):
+    """A module in a tar archive.
+
+    Compressed tar files can only be read front to back, so members
+    are copied to a temporary file as the archive is streamed rather
+    than kept in memory until they are analysed.
+    """
+
+    def __init__(self, name, spooled, size):
+        Source.__init__(self, name, size)
+        self.spooled = spooled
+
+    def read(self):
+        with open(self.spooled, 'rb') as filep:
+            return filep.read()
+
+
+_spool_directory = None
+
+
+def _spool(fileobj):
+    """Copy `fileobj` to a temporary file that is removed at exit,
+    returning its path.
+    """
+    global _spool_directory
+    if _spool_directory is None:
+        _spool_directory = tempfile.mkdtemp(prefix='pyssla-')
+        atexit.register(shutil.rmtree, _spool_directory, True)
+    fd, path = tempfile.mkstemp(dir=_spool_directory, suffix='.py')
+    with os.fdopen(fd, 'wb') as filep:
+        shutil.copyfileobj(fileobj, filep)
+    return path
+
+
+def _tar_sources(path):
+    try:
+        with tarfile.open(path, 'r|*') as archive:
+            for info in archive:
+                if info.isfile() and info.name.endswith('.py'):
+                    yield TarMemberSource(
+                        path + MEMBER_SEPARATOR + info.name,
+                        _spool(archive.extractfile(info)), info.size)
+    except (IOError, OSError, EOFError, tarfile.TarError) as exc:
+        # `EOFError` for a truncated compressed stream.
+        raise SourceError('{0}: cannot read archive: {1}'.format(path, exc))
+
+
+def expand(paths):
+    """Yield a `Source` for every module in `paths`.
+
+    Paths to wheels, zip files and gzipped tar files are expanded to
+    the `.py` files in them; other paths are taken to be modules.
+    Raises `SourceError` if a path cannot be read.
+    """
+    for path in paths:
+        if path.endswith(ZIP_SUFFIXES):
+            for source in _zip_sources(path):
+                yield source
+        elif path.endswith(TAR_SUFFIXES):
+            for source in _tar_sources(path):
+                yield source
+        else:
+            try:
+                source = FileSource(path)
+            except OSError as exc:
+                raise SourceError('{0}: {1}'.format(path, exc.strerror))
+            yield source
@@ -0,0 +1,137 @@
+# Copyright 2013 Johan Rydberg.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""SQLite database of violations, for following trends across runs."""
+
+import sqlite3
+import subprocess
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    revision TEXT
+);
+CREATE TABLE IF NOT EXISTS violations (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    filename TEXT NOT NULL,
+    rule TEXT,
+    lineno INTEGER,
+    value REAL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS violations_run_rule
+    ON violations (run, rule, filename);
+"""
+
+BATCH_SIZE = 5000
+
+
+def current_revision():
+    """Return the git commit checked out in the working directory, or
+    `None` if there is none.
+    """
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def _path_filter(path):
+    if not path:
+        return '', ()
+    return ' AND filename LIKE ? ESCAPE \'\\\'', (
+        path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') +
+        '%',)
+
+
+class Store(object):
+    """A results database at `path`, created if it does not exist."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_run(self, messages, revision=None):
+        """Store `messages` as a new run, returning its id."""
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (started, revision) VALUES (?, ?)',
+                (time.time(), revision))
+            run = cursor.lastrowid
+            rows = ((run, message.filename, message.rule, message.lineno,
+                     message.value, message.message)
+                    for message in messages)
+            while True:
+                batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+                if not batch:
+                    break
+                self.conn.executemany(
+                    'INSERT INTO violations VALUES (?, ?, ?, ?, ?, ?)', batch)
+        return run
+
+    def runs(self):
+        """Return `(id, started, revision, violations)` for all runs."""
+        return self.conn.execute(
+            'SELECT id, started, revision, '
+            '(SELECT COUNT(*) FROM violations WHERE run = runs.id) '
+            'FROM runs ORDER BY id').fetchall()
+
+    def last_runs(self, count):
+        """Return the ids of the `count` most recent runs, oldest
+        first.
+        """
+        rows = self.conn.execute(
+            'SELECT id FROM runs ORDER BY id DESC LIMIT ?', (count,))
+        return sorted(row[0] for row in rows)
+
+    def top(self, run, by='rule', path=None, limit=20):
+        """Return `(key, count, max value)` for the rules or files
+        (`by`) with the most violations in `run`.
+        """
+        if by not in ('rule', 'filename'):
+            raise ValueError("cannot group by {0!r}".format(by))
+        where, params = _path_filter(path)
+        return self.conn.execute(
+            'SELECT {0}, COUNT(*), MAX(value) FROM violations '
+            'WHERE run = ?{1} GROUP BY {0} '
+            'ORDER BY COUNT(*) DESC, {0} LIMIT ?'.format(by, where),
+            (run,) + params + (limit,)).fetchall()
+
+    def diff(self, old, new, path=None):
+        """Return `(rule, filename, old count, new count)` for every
+        rule and file whose number of violations differs between runs
+        `old` and `new`, largest increase first.
+        """
+        where, params = _path_filter(path)
+        counts = {}
+        for index, run in enumerate((old, new)):
+            rows = self.conn.execute(
+                'SELECT rule, filename, COUNT(*) FROM violations '
+                'WHERE run = ?{0} GROUP BY rule, filename'.format(where),
+                (run,) + params)
+            for rule, filename, count in rows:
+                counts.setdefault((rule, filename), [0, 0])[index] = count
+        changes = [(rule, filename, before, after)
+                   for (rule, filename), (before, after) in counts.items()
+                   if before != after]
+        changes.sort(key=lambda change: (change[2] - change[3],) + change[:2])
+        return changes
@@ -38,6 +38,8 @@ setup(
             'too-many-fields = pyssla.rules.code_size:TooManyFieldsRule',
             'too-many-methods = pyssla.rules.code_size:TooManyMethods',
             'cyclomatic-complexity = pyssla.rules.complexity:CyclomaticComplexityRule',
+            'algorithmic-complexity = pyssla.rules.complexity:AlgorithmicComplexityRule',
+            'blocking-call-in-async = pyssla.rules.async_code:BlockingCallInAsyncRule',
             'use-isinstance = pyssla.rules.basic:UseIsinstanceRule',
             'one-import-per-line = pyssla.rules.basic:OneImportPerLineRule',
             'use-imports-for-packages-and-modules-only = pyssla.rules.basic:UseImportsForPackagesAndModulesOnlyRule',
@@ -47,6 +49,20 @@ setup(
             'use-in-dict-not-in-dict-keys = pyssla.rules.basic:UseInDictNotInDictKeys',
             'short-variable = pyssla.rules.naming:ShortVariableRule',
             'changing-name-in-closure = pyssla.rules.bugs:ChangingNameInClosureRule',
+            'duplicate-code = pyssla.rules.duplicate_code:DuplicateCodeRule',
+            'unused-import = pyssla.rules.unused_code:UnusedImportRule',
+            'unused-variable = pyssla.rules.unused_code:UnusedVariableRule',
+            'unused-argument = pyssla.rules.unused_code:UnusedArgumentRule',
+            'string-concatenation-in-loop = pyssla.rules.performance:StringConcatenationInLoopRule',
+            'membership-test-on-list-in-loop = pyssla.rules.performance:MembershipTestOnListInLoopRule',
+            'regex-in-loop = pyssla.rules.performance:RegexInLoopRule',
+            'loop-invariant-lookup = pyssla.rules.performance:LoopInvariantLookupRule',
+            'iterate-dict-directly = pyssla.rules.performance:IterateDictDirectlyRule',
+            'import-time-side-effect = pyssla.rules.import_time:ImportTimeSideEffectRule',
+            'heavy-import = pyssla.rules.import_time:HeavyImportRule',
+            'import-time-cost = pyssla.rules.import_time:ImportTimeCostRule',
+            'use-slots = pyssla.rules.memory:UseSlotsRule',
+            'unbounded-growth = pyssla.rules.memory:UnboundedGrowthRule',
             ],
         },
     zip_safe=False